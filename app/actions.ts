@@ -75,14 +75,18 @@ export async function signInWithGoogle() {
   }
 }
 
-export async function getGesture(imageBase64: string) {
+export async function getGesture(imageBase64: string, sessionId?: string, signs?: string[]) {
   try {
     const response = await fetch("http://localhost:8000/api/gesture", {
       method: "POST",
       headers: {
-        "Content-Type": "application/json",
+        "Content-Type": "image/jpeg",
+        ...(sessionId ? { "X-Session-Id": sessionId } : {}),
+        // Only the lesson's signs are looked for
+        ...(signs?.length ? { "X-Signs": signs.join(",") } : {}),
       },
-      body: JSON.stringify({ image: imageBase64 }),
+      // Send the raw JPEG so the recognizer can skip JSON and base64 decoding
+      body: Buffer.from(imageBase64, "base64"),
     });
 
     if (!response.ok) {
@@ -96,14 +100,18 @@ export async function getGesture(imageBase64: string) {
   }
 }
 
-export async function getNumber(imageBase64: string) {
+export async function getNumber(imageBase64: string, sessionId?: string, signs?: string[]) {
   try {
     const response = await fetch("http://localhost:8000/api/number", {
       method: "POST",
       headers: {
-        "Content-Type": "application/json",
+        "Content-Type": "image/jpeg",
+        ...(sessionId ? { "X-Session-Id": sessionId } : {}),
+        // Only the lesson's signs are looked for
+        ...(signs?.length ? { "X-Signs": signs.join(",") } : {}),
       },
-      body: JSON.stringify({ image: imageBase64 }),
+      // Send the raw JPEG so the recognizer can skip JSON and base64 decoding
+      body: Buffer.from(imageBase64, "base64"),
     });
 
     if (!response.ok) {
@@ -113,8 +121,10 @@ export async function getNumber(imageBase64: string) {
     const result = await response.json();
     return { 
       gesture: result.number, // Map number to gesture for compatibility with existing component
+      sign: result.number,
       meaning: result.meaning,
-      confidence: result.confidence || "0.00"
+      confidence: result.confidence || "0.00",
+      next_frame_ms: result.next_frame_ms
     };
   } catch (error) {
     console.error("Error processing number recognition:", error);
@@ -122,3 +132,62 @@ export async function getNumber(imageBase64: string) {
   }
 }
 
+
+// Packs the 21 [x, y, z] landmarks of each hand into little-endian float32
+// values (252 bytes per hand) for the recognizer's landmark endpoints
+function packLandmarks(hands: number[][][]) {
+  return Buffer.from(new Float32Array(hands.flat(2)).buffer);
+}
+
+export async function getGestureFromLandmarks(hands: number[][][], sessionId?: string, handedness?: string[]) {
+  try {
+    const response = await fetch("http://localhost:8000/api/gesture/landmarks", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/octet-stream",
+        ...(sessionId ? { "X-Session-Id": sessionId } : {}),
+        ...(handedness ? { "X-Handedness": handedness.join(",") } : {}),
+      },
+      body: packLandmarks(hands),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Python server returned ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error("Error processing gesture recognition:", error);
+    return { gesture: "Error detecting gesture" };
+  }
+}
+
+export async function getNumberFromLandmarks(hands: number[][][], sessionId?: string, handedness?: string[]) {
+  try {
+    const response = await fetch("http://localhost:8000/api/number/landmarks", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/octet-stream",
+        ...(sessionId ? { "X-Session-Id": sessionId } : {}),
+        ...(handedness ? { "X-Handedness": handedness.join(",") } : {}),
+      },
+      body: packLandmarks(hands),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Python server returned ${response.status}`);
+    }
+
+    const result = await response.json();
+    return {
+      gesture: result.number, // Map number to gesture for compatibility with existing component
+      sign: result.number,
+      meaning: result.meaning,
+      confidence: result.confidence || "0.00",
+      next_frame_ms: result.next_frame_ms
+    };
+  } catch (error) {
+    console.error("Error processing number recognition:", error);
+    return { gesture: "Error detecting number", confidence: "0.00" };
+  }
+}
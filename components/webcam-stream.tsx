@@ -4,6 +4,10 @@
 import { getGesture, getNumber } from "@/app/actions";
 import React, { useRef, useEffect, useState } from "react";
 
+// Delay before the next frame when the recognizer does not suggest one
+// (e.g. the request failed), in milliseconds
+const FALLBACK_FRAME_DELAY = 1000;
+
 interface WebcamStreamProps {
   mode?: "gesture" | "number";
   signs: Set<string>;
@@ -15,6 +19,11 @@ const WebcamStream: React.FC<WebcamStreamProps> = ({
 }: WebcamStreamProps) => {
   const videoRef = useRef<HTMLVideoElement>(null);
   const [gesture, setGesture] = useState<string>("No hand detected");
+  // Identifies this stream to the recognizer so it keeps its own tracking state
+  const sessionId = useRef<string>(crypto.randomUUID());
+  // All of the lesson's signs, declared to the recognizer so it only looks
+  // for them; `signs` itself shrinks as the learner performs them
+  const lessonSigns = useRef<string[]>(Array.from(signs));
 
   useEffect(() => {
     async function startWebcam() {
@@ -61,16 +70,17 @@ const WebcamStream: React.FC<WebcamStreamProps> = ({
     return canvas.toDataURL("image/jpeg", 0.8).split(",")[1]; // Remove the data URL prefix
   };
 
-  const detectGesture = async () => {
+  // Returns how many milliseconds to wait before sending the next frame
+  const detectGesture = async (): Promise<number> => {
     const imageBase64 = captureImageAsBase64();
-    if (!imageBase64) return;
+    if (!imageBase64) return FALLBACK_FRAME_DELAY;
 
     try {
       let result;
       if (mode === "number") {
-        result = await getNumber(imageBase64);
+        result = await getNumber(imageBase64, sessionId.current, lessonSigns.current);
       } else {
-        result = await getGesture(imageBase64);
+        result = await getGesture(imageBase64, sessionId.current, lessonSigns.current);
       }
       setGesture(result.gesture || "No gesture detected");
       signs.delete(result.sign);
@@ -78,18 +88,31 @@ const WebcamStream: React.FC<WebcamStreamProps> = ({
         `${mode === "number" ? "Number" : "Gesture"} detected:`,
         result.gesture
       );
+      return result.next_frame_ms ?? FALLBACK_FRAME_DELAY;
     } catch (error) {
       console.error(
         `Error detecting ${mode === "number" ? "number" : "gesture"}:`,
         error
       );
       setGesture(`Error detecting ${mode === "number" ? "number" : "gesture"}`);
+      return FALLBACK_FRAME_DELAY;
     }
   };
 
   useEffect(() => {
-    const intervalId = setInterval(detectGesture, 100);
-    return () => clearInterval(intervalId);
+    // Send the next frame only once the last one has been answered, after the
+    // delay the recognizer suggests for its current load
+    let timeoutId: ReturnType<typeof setTimeout>;
+    let stopped = false;
+    const loop = async () => {
+      const delay = await detectGesture();
+      if (!stopped) timeoutId = setTimeout(loop, delay);
+    };
+    timeoutId = setTimeout(loop, 0);
+    return () => {
+      stopped = true;
+      clearTimeout(timeoutId);
+    };
   }, []);
 
   return (
@@ -105,7 +128,7 @@ const WebcamStream: React.FC<WebcamStreamProps> = ({
       {/* Overlay for gesture display */}
       <div
         className={`absolute bottom-0 left-0 right-0 p-4 ${
-          gesture !== "No hand detected" && gesture !== "No recognized gesture"
+          gesture !== "No hand detected" && gesture !== "No recognized gesture" && gesture !== "Pending"
             ? "bg-green-500"
             : "bg-gray-700"
         } text-white font-bold text-xl text-center`}>
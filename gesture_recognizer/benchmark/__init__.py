@@ -0,0 +1,15 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+"""
+Benchmarks for the gesture recognizer hot path.
+
+Run from the gesture_recognizer directory:
+
+    python -m benchmark --frames path/to/recording --output bench.json
+
+Without --frames, synthetic JPEG frames and landmark arrays are used so the
+suite runs without a camera.
+"""
+from benchmark.runner import run_benchmarks
+from benchmark.stats import compare, measure
+
+__all__ = ["run_benchmarks", "measure", "compare"]
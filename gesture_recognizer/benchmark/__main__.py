@@ -0,0 +1,55 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import argparse
+import json
+import os
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark the gesture recognizer hot path")
+    parser.add_argument("--frames", help="directory of recorded .jpg/.png frames and .npy landmark arrays")
+    parser.add_argument("--count", type=int, default=100, help="number of synthetic frames and hands")
+    parser.add_argument("--width", type=int, default=640, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=480, help="synthetic frame height")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the inputs per stage")
+    parser.add_argument("--skip-stages", action="store_true", help="only benchmark the endpoints")
+    parser.add_argument("--skip-endpoints", action="store_true", help="only benchmark the individual stages")
+    parser.add_argument("--backend", default="thread", choices=["process", "thread"], help="inference backend for the endpoints")
+    parser.add_argument("--workers", type=int, default=1, help="inference workers for the endpoints")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # main.py reads its configuration at import time
+    os.environ.setdefault("ASL_INFERENCE_BACKEND", args.backend)
+    os.environ.setdefault("ASL_INFERENCE_WORKERS", str(args.workers))
+
+    from benchmark import compare, run_benchmarks
+
+    report = run_benchmarks(
+        frames_dir=args.frames,
+        count=args.count,
+        width=args.width,
+        height=args.height,
+        repeat=args.repeat,
+        stages=not args.skip_stages,
+        endpoints=not args.skip_endpoints,
+    )
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"] = compare(report["results"], json.load(f)["results"])
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import logging
+import os
+import platform
+import resource
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from benchmark.stats import measure
+from features import HandFeatures
+from preprocess import downscale
+from rules import GESTURE_RULES, NUMBER_RULES
+from smoothing import Smoother
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+# Open right hand in normalized image coordinates, MediaPipe landmark order
+OPEN_HAND = np.array([
+    [0.50, 0.80], [0.43, 0.75], [0.38, 0.68], [0.35, 0.61], [0.32, 0.55],
+    [0.45, 0.55], [0.44, 0.45], [0.44, 0.39], [0.44, 0.33],
+    [0.50, 0.54], [0.50, 0.43], [0.50, 0.36], [0.50, 0.30],
+    [0.55, 0.55], [0.56, 0.45], [0.56, 0.39], [0.56, 0.34],
+    [0.60, 0.58], [0.62, 0.50], [0.63, 0.45], [0.64, 0.41],
+], dtype=np.float32)
+
+
+def load_recordings(frames_dir: Path) -> Tuple[List[bytes], Optional[np.ndarray]]:
+    """
+    Reads recorded frames (JPEG/PNG files) and landmark arrays (.npy files of
+    shape (N, 21, 3) or (21, 3)) from a directory, in file name order.
+    """
+    frames = []
+    landmarks = []
+    for path in sorted(frames_dir.iterdir()):
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            frames.append(path.read_bytes())
+        elif path.suffix == ".npy":
+            landmarks.append(np.load(path).astype(np.float32).reshape(-1, 21, 3))
+    return frames, (np.concatenate(landmarks) if landmarks else None)
+
+
+def synthetic_frames(count: int, width: int, height: int, seed: int = 0) -> List[bytes]:
+    """
+    JPEG frames of smooth noise, all different so no result can be reused.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        small = rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+        image = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+        frames.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return frames
+
+
+def synthetic_landmarks(count: int, seed: int = 0) -> np.ndarray:
+    """
+    (count, 21, 3) hands built from an open hand with random fingers folded
+    towards their knuckles and some jitter, so different rules fire.
+    """
+    rng = np.random.default_rng(seed)
+    hands = np.repeat(OPEN_HAND[np.newaxis], count, axis=0)
+    for tip in (4, 8, 12, 16, 20):
+        folded = rng.random(count) < 0.5
+        base = hands[folded, tip - 3]
+        for joint in (tip - 2, tip - 1, tip):
+            hands[folded, joint] = base + (hands[folded, joint] - base) * 0.3
+    hands += rng.normal(0, 0.01, hands.shape).astype(np.float32)
+    depth = rng.normal(0, 0.02, (count, 21, 1)).astype(np.float32)
+    return np.concatenate([hands, depth], axis=2)
+
+
+def _stage_benchmarks(frames: List[bytes], landmarks: np.ndarray, max_side: int, repeat: int) -> List[Dict]:
+    results = []
+
+    decoded = [cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR) for frame in frames]
+    results.append(measure("decode", lambda frame: cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR), frames, repeat))
+
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in decoded]
+    results.append(measure("color_conversion", lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), decoded, repeat))
+
+    results.append(measure("downscale", lambda frame: downscale(frame, max_side), rgb_frames, repeat))
+
+    import mediapipe as mp
+
+    inputs = [np.ascontiguousarray(downscale(frame, max_side)) for frame in rgb_frames]
+    with mp.solutions.hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
+        results.append(measure("hands_process", hands.process, inputs, repeat))
+
+    single_hands = [hand[np.newaxis] for hand in landmarks]
+    results.append(measure("features", HandFeatures, single_hands, repeat))
+    features = [HandFeatures(hand) for hand in single_hands]
+    results.append(measure("gesture_rules", GESTURE_RULES.evaluate, features, repeat))
+    results.append(measure("number_rules", NUMBER_RULES.evaluate, features, repeat))
+    results.append(measure("features_batch", HandFeatures, [landmarks], repeat * 10))
+    results.append(measure("number_rules_batch", NUMBER_RULES.evaluate, [HandFeatures(landmarks)], repeat * 10))
+
+    smoother = Smoother()
+    detections = [(rule.label, rule.confidence) if rule else (None, 0.0) for rule in NUMBER_RULES.evaluate(HandFeatures(landmarks))]
+    results.append(measure("smoothing", lambda detection: smoother.update(*detection), detections, repeat))
+    return results
+
+
+def _endpoint_benchmarks(frames: List[bytes], repeat: int) -> List[Dict]:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Per-request logging would dominate the timings
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = []
+    headers = {"Content-Type": "image/jpeg", "X-Session-Id": "benchmark"}
+    with TestClient(main.app) as client:
+        for path in ("/api/gesture", "/api/number"):
+            results.append(measure(
+                f"endpoint {path}",
+                lambda frame: client.post(path, content=frame, headers=headers).raise_for_status(),
+                frames,
+                repeat,
+            ))
+        batch = frames[:main.MAX_BATCH_SIZE]
+        results.append(measure(
+            "endpoint /api/gesture/batch",
+            lambda files: client.post("/api/gesture/batch", files=files, headers={"X-Session-Id": "benchmark"}).raise_for_status(),
+            [[("images", (f"{i}.jpg", frame, "image/jpeg")) for i, frame in enumerate(batch)]],
+            repeat,
+            warmup=1,
+            memory_samples=1,
+        ))
+    return results
+
+
+def run_benchmarks(
+    frames_dir: Optional[str] = None,
+    count: int = 100,
+    width: int = 640,
+    height: int = 480,
+    repeat: int = 1,
+    stages: bool = True,
+    endpoints: bool = True,
+) -> Dict:
+    """
+    Runs the per-stage and end-to-end benchmarks and returns a JSON-ready
+    report. Recorded frames and landmarks from `frames_dir` are used when
+    available, synthetic ones otherwise.
+    """
+    frames: List[bytes] = []
+    landmarks = None
+    if frames_dir:
+        frames, landmarks = load_recordings(Path(frames_dir))
+    source = "recorded" if frames else "synthetic"
+    if not frames:
+        frames = synthetic_frames(count, width, height)
+    if landmarks is None:
+        landmarks = synthetic_landmarks(count)
+
+    results = []
+    if stages:
+        max_side = int(os.environ.get("ASL_INFERENCE_MAX_SIDE", "512"))
+        results.extend(_stage_benchmarks(frames, landmarks, max_side, repeat))
+    if endpoints:
+        results.extend(_endpoint_benchmarks(frames, repeat))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "frames": source,
+            "frame_count": len(frames),
+            "landmark_count": len(landmarks),
+            # ru_maxrss is in kilobytes on Linux
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+    }
@@ -0,0 +1,60 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def measure(name: str, fn: Callable, inputs: Sequence, repeat: int = 1, warmup: int = 3, memory_samples: int = 5) -> Dict:
+    """
+    Times `fn` on every input `repeat` times and reports latency percentiles
+    in milliseconds, throughput and the peak traced memory of a separate,
+    untimed pass (tracemalloc slows the timed calls down too much).
+    """
+    for item in list(inputs)[:warmup]:
+        fn(item)
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for item in list(inputs)[:memory_samples]:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000
+    total = float(np.sum(timings))
+    return {
+        "stage": name,
+        "samples": len(timings),
+        "mean_ms": round(float(timings_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(timings_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 4),
+        "fps": round(len(timings) / total, 2) if total else None,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict]) -> Dict[str, Dict]:
+    """
+    p50/p95 latency of each stage relative to a baseline run; values above 1
+    are slower than the baseline.
+    """
+    previous = {result["stage"]: result for result in baseline}
+    ratios = {}
+    for result in results:
+        before = previous.get(result["stage"])
+        if before is None:
+            continue
+        ratios[result["stage"]] = {
+            key: round(result[key] / before[key], 3) if before[key] else None
+            for key in ("p50_ms", "p95_ms")
+        }
+    return ratios
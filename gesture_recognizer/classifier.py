@@ -0,0 +1,139 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import json
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+# Training label for frames that show no sign at all
+NO_SIGN = "none"
+
+WEIGHT_NAMES = ("w1", "b1", "w2", "b2")
+
+
+class Prediction(NamedTuple):
+    """
+    A hand's predicted label; has the same fields as the rules' Rule objects
+    that main.py reads.
+    """
+    label: str
+    confidence: float
+
+
+def normalize_landmarks(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Flattens (N, 21, 3) landmarks into (N, 63) vectors that do not depend on
+    where the hand is in the frame or how big it is: the wrist is moved to
+    the origin and everything is scaled by the wrist to middle knuckle
+    distance. Orientation is kept, since e.g. LEFT and RIGHT differ only by
+    it.
+    """
+    relative = landmarks - landmarks[:, :1]
+    palm = np.linalg.norm(relative[:, 9, :2], axis=1)
+    scale = np.where(palm > 1e-6, palm, 1.0)[:, np.newaxis, np.newaxis]
+    return (relative / scale).reshape(len(landmarks), -1).astype(np.float32)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class LandmarkClassifier:
+    """
+    A one hidden layer perceptron over normalized landmark vectors. All hands
+    of a frame go through the network together, as two matrix products.
+
+    Saved models are a directory with one .npy file per weight array and a
+    labels.json; `load` memory-maps the weights, so server processes share
+    them and start without reading them in.
+    """
+
+    def __init__(self, labels: Sequence[str], w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: np.ndarray):
+        self.labels = list(labels)
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+
+    def probabilities(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        (N, labels) class probabilities of (N, 21, 3) landmarks.
+        """
+        hidden = np.maximum(normalize_landmarks(landmarks) @ self.w1 + self.b1, 0)
+        return _softmax(hidden @ self.w2 + self.b2)
+
+    def predict(self, landmarks: np.ndarray) -> List[Optional[Prediction]]:
+        """
+        The most likely label of every hand, None for hands classified as
+        showing no sign.
+        """
+        if not len(landmarks):
+            return []
+        probabilities = self.probabilities(landmarks)
+        best = probabilities.argmax(axis=1)
+        return [
+            None if self.labels[i] == NO_SIGN else Prediction(self.labels[i], float(probabilities[row, i]))
+            for row, i in enumerate(best)
+        ]
+
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in WEIGHT_NAMES:
+            np.save(path / f"{name}.npy", np.ascontiguousarray(getattr(self, name), dtype=np.float32))
+        (path / "labels.json").write_text(json.dumps(self.labels))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LandmarkClassifier":
+        path = Path(path)
+        labels = json.loads((path / "labels.json").read_text())
+        weights = [np.load(path / f"{name}.npy", mmap_mode="r") for name in WEIGHT_NAMES]
+        return cls(labels, *weights)
+
+    @classmethod
+    def train(
+        cls,
+        landmarks: np.ndarray,
+        labels: Sequence[str],
+        hidden: int = 64,
+        epochs: int = 300,
+        learning_rate: float = 0.01,
+        weight_decay: float = 1e-4,
+        seed: int = 0,
+    ) -> "LandmarkClassifier":
+        """
+        Fits a classifier to (N, 21, 3) landmarks and their labels with
+        full-batch Adam on the cross-entropy loss.
+        """
+        classes = sorted(set(labels))
+        index = {label: i for i, label in enumerate(classes)}
+        x = normalize_landmarks(landmarks)
+        targets = np.zeros((len(x), len(classes)), dtype=np.float32)
+        targets[np.arange(len(x)), [index[label] for label in labels]] = 1
+
+        rng = np.random.default_rng(seed)
+        params = [
+            rng.normal(0, np.sqrt(2 / x.shape[1]), (x.shape[1], hidden)).astype(np.float32),
+            np.zeros(hidden, dtype=np.float32),
+            rng.normal(0, np.sqrt(2 / hidden), (hidden, len(classes))).astype(np.float32),
+            np.zeros(len(classes), dtype=np.float32),
+        ]
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+        beta1, beta2 = 0.9, 0.999
+
+        for step in range(1, epochs + 1):
+            w1, b1, w2, b2 = params
+            pre = x @ w1 + b1
+            hidden_out = np.maximum(pre, 0)
+            # Gradient of the mean cross-entropy with respect to the logits
+            d_logits = (_softmax(hidden_out @ w2 + b2) - targets) / len(x)
+            d_hidden = (d_logits @ w2.T) * (pre > 0)
+            grads = [x.T @ d_hidden + weight_decay * w1, d_hidden.sum(axis=0), hidden_out.T @ d_logits + weight_decay * w2, d_logits.sum(axis=0)]
+
+            for p, g, m, v in zip(params, grads, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+
+        return cls(classes, *params)
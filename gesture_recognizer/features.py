@@ -0,0 +1,230 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_TIP = 4
+FINGER_TIPS = np.array([8, 12, 16, 20])  # index, middle, ring, pinky
+ALL_TIPS = np.array([4, 8, 12, 16, 20])  # thumb first
+FINGER_MCPS = FINGER_TIPS - 3
+
+# Positions of each digit in the per-finger arrays below
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+
+# (base, joint, tip) triplets whose angle at the joint tells if a digit is straight
+ANGLE_BASES = np.array([1, 5, 9, 13, 17])
+ANGLE_JOINTS = np.array([2, 6, 10, 14, 18])
+ANGLE_TIPS = ALL_TIPS
+
+
+def hand_to_array(hand_landmarks) -> np.ndarray:
+    """
+    Converts a MediaPipe NormalizedLandmarkList into a (21, 3) float32 array.
+    """
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def hands_to_array(multi_hand_landmarks) -> np.ndarray:
+    """
+    Converts MediaPipe's multi_hand_landmarks into a (N, 21, 3) float32 array.
+    """
+    if not multi_hand_landmarks:
+        return np.empty((0, 21, 3), dtype=np.float32)
+    return np.stack([hand_to_array(hand) for hand in multi_hand_landmarks])
+
+
+def hands_to_handedness(multi_handedness) -> List[str]:
+    """
+    MediaPipe's "Left"/"Right" label of each hand in multi_handedness.
+    """
+    if not multi_handedness:
+        return []
+    return [hand.classification[0].label for hand in multi_handedness]
+
+
+def _plain_points(value):
+    """
+    Replaces {"x", "y", "z"} landmark objects in nested lists with [x, y, z].
+    """
+    if isinstance(value, dict):
+        return [value["x"], value["y"], value.get("z", 0.0)]
+    if isinstance(value, (list, tuple)):
+        return [_plain_points(item) for item in value]
+    return value
+
+
+def parse_landmarks(data) -> np.ndarray:
+    """
+    Converts landmarks sent by a client into a (N, 21, 3) float32 array.
+    Accepts packed little-endian float32 bytes (63 values per hand), or a
+    JSON list for one hand or several of [x, y, z] triples, {"x", "y", "z"}
+    objects as produced by MediaPipe in the browser, or flat numbers.
+    Raises ValueError for anything else.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if len(data) % (21 * 3 * 4):
+            raise ValueError("Landmark data must be 63 float32 values per hand")
+        landmarks = np.frombuffer(data, dtype="<f4").astype(np.float32)
+    else:
+        try:
+            landmarks = np.asarray(_plain_points(data), dtype=np.float32)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Landmarks must be a list of [x, y, z] points")
+        if landmarks.size % (21 * 3):
+            raise ValueError("Each hand needs 21 landmarks with x, y and z")
+
+    if not np.isfinite(landmarks).all():
+        raise ValueError("Landmarks must be finite numbers")
+    return landmarks.reshape(-1, 21, 3)
+
+
+def canonical_landmarks(landmarks: np.ndarray, handedness: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+    """
+    The landmarks as the classifiers see them: hands MediaPipe labels
+    "Right" are mirrored horizontally onto right-hand geometry (see
+    TrackedHands). Returns the landmarks themselves when nothing is mirrored.
+    """
+    if handedness is None or "Right" not in handedness:
+        return landmarks
+    mirrored = np.array([label == "Right" for label in handedness], dtype=bool)
+    canonical = landmarks.copy()
+    canonical[mirrored, :, 0] = 1 - canonical[mirrored, :, 0]
+    return canonical
+
+
+class HandFeatures:
+    """
+    Geometric features of a batch of hands, computed with array operations
+    over a (N, 21, 3) landmark array. Every attribute has the batch on its
+    first axis. Per-finger arrays are ordered index, middle, ring, pinky;
+    per-digit arrays (five entries) start with the thumb.
+    """
+
+    def __init__(self, landmarks: np.ndarray):
+        landmarks = np.asarray(landmarks, dtype=np.float32)
+        if landmarks.ndim == 2:
+            landmarks = landmarks[np.newaxis]
+        self.landmarks = landmarks
+        x = landmarks[..., 0]
+        y = landmarks[..., 1]
+
+        # Thumb direction
+        self.thumb_up = (y[:, 4] < y[:, 3]) & (y[:, 3] < y[:, 2])
+        self.thumb_down = (y[:, 4] > y[:, 3]) & (y[:, 3] > y[:, 2])
+        self.thumb_out = x[:, 4] > x[:, 3]
+        self.thumb_raised = y[:, 4] < y[:, 2]
+        self.palm_left = x[:, 5] < x[:, WRIST]
+
+        # Finger states from tip, DIP, PIP and MCP positions
+        tip_x, tip_y = x[:, FINGER_TIPS], y[:, FINGER_TIPS]
+        dip_y = y[:, FINGER_TIPS - 1]
+        pip_x, pip_y = x[:, FINGER_TIPS - 2], y[:, FINGER_TIPS - 2]
+        mcp_x, mcp_y = x[:, FINGER_MCPS], y[:, FINGER_MCPS]
+        self.folded = tip_x < mcp_x
+        self.pointing_up = (tip_y < pip_y) & (pip_y < mcp_y)
+        self.curled = (tip_y > dip_y) & (dip_y > pip_y)
+        self.tip_raised = (tip_y < dip_y) & (dip_y < pip_y)
+        self.pointing_left = tip_x < pip_x
+        self.pointing_right = tip_x > pip_x
+
+        # Pairwise 2D distances between the five fingertips, (N, 5, 5)
+        tips = landmarks[:, ALL_TIPS, :2]
+        deltas = tips[:, :, np.newaxis, :] - tips[:, np.newaxis, :, :]
+        self.tip_distances = np.sqrt((deltas ** 2).sum(axis=-1))
+
+        # Bend angle of each digit in degrees, in [0, 360)
+        base = landmarks[:, ANGLE_BASES, :2]
+        joint = landmarks[:, ANGLE_JOINTS, :2]
+        tip = landmarks[:, ANGLE_TIPS, :2]
+        angles = np.degrees(
+            np.arctan2(tip[..., 1] - joint[..., 1], tip[..., 0] - joint[..., 0])
+            - np.arctan2(base[..., 1] - joint[..., 1], base[..., 0] - joint[..., 0])
+        )
+        self.angles = np.where(angles < 0, angles + 360, angles)
+
+        # Extended digits: straight and, for fingers, tip above the knuckle
+        self.extended = np.empty((len(landmarks), 5), dtype=bool)
+        self.extended[:, THUMB] = (self.angles[:, THUMB] > 150) & self.thumb_out
+        self.extended[:, INDEX:] = (self.angles[:, INDEX:] > 160) & (tip_y < mcp_y)
+        self.thumb_across_palm = (x[:, 4] < x[:, 9]) & ~self.extended[:, THUMB]
+
+    def __len__(self) -> int:
+        return len(self.landmarks)
+
+    def distance(self, a: int, b: int) -> np.ndarray:
+        """
+        Distance between the tips of digits `a` and `b` (THUMB, INDEX, ...).
+        """
+        return self.tip_distances[:, a, b]
+
+    def take(self, indices) -> "HandFeatures":
+        """
+        The features of a subset of the hands, without computing them again.
+        """
+        subset = HandFeatures.__new__(HandFeatures)
+        for name, value in vars(self).items():
+            setattr(subset, name, value[indices])
+        return subset
+
+
+class PairFeatures:
+    """
+    Features of a batch of two-handed poses: the features of each hand plus
+    distances between the two hands, measured in frame coordinates.
+    """
+
+    def __init__(self, right: HandFeatures, left: HandFeatures, right_landmarks: np.ndarray, left_landmarks: np.ndarray):
+        self.right = right
+        self.left = left
+        # (P, 5, 5) distances from each right fingertip to each left fingertip
+        deltas = right_landmarks[:, ALL_TIPS, np.newaxis, :2] - left_landmarks[:, np.newaxis, ALL_TIPS, :2]
+        self.tip_distances = np.sqrt((deltas ** 2).sum(axis=-1))
+        self.wrist_distance = np.linalg.norm(right_landmarks[:, WRIST, :2] - left_landmarks[:, WRIST, :2], axis=1)
+
+    def __len__(self) -> int:
+        return len(self.wrist_distance)
+
+    def distance(self, a: int, b: int) -> np.ndarray:
+        """
+        Distance between the tip of digit `a` of the right hand and the tip
+        of digit `b` of the left hand.
+        """
+        return self.tip_distances[:, a, b]
+
+
+class TrackedHands:
+    """
+    The hands found in one frame, with their features computed once and
+    shared by every classifier.
+
+    The rules describe hands as a right hand looks in an unmirrored frame.
+    MediaPipe labels such hands "Left", since it assumes selfie frames, so
+    hands labelled "Right" are mirrored horizontally before their features
+    are computed and one set of rules covers both hands. `mirrored` marks
+    those hands; directions recognized on them are flipped back.
+    `handedness` holds MediaPipe's labels, None where unknown (such hands
+    are not mirrored).
+    """
+
+    def __init__(self, landmarks: np.ndarray, handedness: Optional[Sequence[Optional[str]]] = None):
+        self.landmarks = landmarks
+        self.handedness: List[Optional[str]] = list(handedness) if handedness is not None else [None] * len(landmarks)
+        self.mirrored = np.array([label == "Right" for label in self.handedness], dtype=bool)
+        self.features = HandFeatures(canonical_landmarks(landmarks, self.handedness))
+
+    def __len__(self) -> int:
+        return len(self.landmarks)
+
+    def pair(self) -> Optional[PairFeatures]:
+        """
+        Features of the first "Left" and first "Right" labelled hands as a
+        pair, or None without one of each. The "right" hand of the pair is
+        the one MediaPipe labels "Left", i.e. the unmirrored one.
+        """
+        if "Left" not in self.handedness or "Right" not in self.handedness:
+            return None
+        first = [self.handedness.index("Left")]
+        second = [self.handedness.index("Right")]
+        return PairFeatures(self.features.take(first), self.features.take(second), self.landmarks[first], self.landmarks[second])
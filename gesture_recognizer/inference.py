@@ -0,0 +1,358 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import asyncio
+import multiprocessing
+import threading
+import time
+import zlib
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from preprocess import Detection, Tracker
+from sessions import HandsPool
+
+# Hands trackers owned by the current worker process
+_hands_pool: Optional[HandsPool] = None
+_init_lock = threading.Lock()
+
+# Seconds spent in each stage of processing a frame
+Timings = Dict[str, float]
+
+# Frame index, time in seconds and detection of a sampled video frame
+VideoDetection = Tuple[int, float, Detection]
+
+# Times in a row a slot's worker may die before the slot counts as broken
+MAX_SLOT_CRASHES = 3
+
+
+# cv2.imdecode flags for decoding JPEGs directly at 1/2, 1/4 or 1/8 size
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class InferenceBusy(Exception):
+    """
+    Raised when the inference queue is full and a frame has to be rejected.
+    """
+
+
+def _init_worker(max_sessions: int, idle_timeout: float, tracker_options: Dict, max_hands: int = 2) -> None:
+    """
+    Builds the worker's tracker pool. MediaPipe is imported here so that it is
+    only loaded by the processes that actually run inference.
+    `tracker_options` are passed on to every Tracker, and each tracks up to
+    `max_hands` hands.
+    """
+    global _hands_pool
+    with _init_lock:
+        if _hands_pool is not None:
+            # Thread workers share the pool of their process
+            return
+        import mediapipe as mp
+
+        mp_hands = mp.solutions.hands
+        _hands_pool = HandsPool(
+            lambda: Tracker(
+                mp_hands.Hands(max_num_hands=max_hands, min_detection_confidence=0.5, min_tracking_confidence=0.5),
+                **tracker_options,
+            ),
+            max_instances=max_sessions,
+            idle_timeout=idle_timeout,
+        )
+
+
+def decode_frame(image_bytes: bytes, reduction: int = 1) -> np.ndarray:
+    """
+    Decodes encoded image bytes (JPEG/PNG) into an RGB frame for MediaPipe.
+    The bytes are decoded in place without intermediate copies; `reduction`
+    (1, 2, 4 or 8) lets the JPEG decoder skip detail it would otherwise
+    decode at full size.
+    """
+    if reduction not in DECODE_FLAGS:
+        raise ValueError(f"Unsupported decode reduction: {reduction}")
+    frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), DECODE_FLAGS[reduction])
+    if frame is None:
+        raise ValueError("Could not decode image")
+
+    # OpenCV decodes to BGR, MediaPipe expects RGB
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def track_hands(session_id: str, image_bytes: bytes, reduction: int = 1) -> Tuple[Detection, Timings]:
+    """
+    Decodes a frame and runs the session's hand tracker on it. Returns the
+    landmarks of every detected hand as a (N, 21, 3) array with MediaPipe's
+    handedness of each, and the seconds spent in each stage ("decode",
+    "preprocess" and "inference").
+    """
+    start = time.perf_counter()
+    frame = decode_frame(image_bytes, reduction)
+    decoded = time.perf_counter()
+    with _hands_pool.acquire(session_id) as tracker:
+        detection = tracker.track(frame)
+        return detection, {"decode": decoded - start, **tracker.timings}
+
+
+def track_hands_batch(session_id: str, frames: List[Optional[bytes]], reduction: int = 1) -> Tuple[List[Optional[Detection]], List[Timings]]:
+    """
+    Runs track_hands over a list of encoded frames in order. Frames that are
+    missing or cannot be decoded yield None instead of failing the batch.
+    Returns the detections and the stage timings of each tracked frame.
+    """
+    results = []
+    timings = []
+    for image_bytes in frames:
+        if image_bytes is None:
+            results.append(None)
+            continue
+        try:
+            detection, frame_timings = track_hands(session_id, image_bytes, reduction)
+        except (ValueError, cv2.error):
+            results.append(None)
+            continue
+        results.append(detection)
+        timings.append(frame_timings)
+    return results, timings
+
+
+def video_info(path: str) -> Tuple[int, float]:
+    """
+    Frame count and frame rate of a video file as reported by its container,
+    0 when unknown. Raises ValueError if the file cannot be opened.
+    """
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        return max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT))), max(0.0, capture.get(cv2.CAP_PROP_FPS))
+    finally:
+        capture.release()
+
+
+def read_video(path: str, start: int = 0, stop: Optional[int] = None, stride: int = 1) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Decodes every `stride`-th frame of a video file from frame `start` up to
+    (not including) `stop`, or the end, one frame at a time. Yields the frame
+    index, its time in seconds and the RGB frame. Frames in between are
+    grabbed to keep the decoder in step but never converted.
+    """
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        if start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while stop is None or index < stop:
+            if (index - start) % stride:
+                if not capture.grab():
+                    break
+            else:
+                seconds = index / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, seconds, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        capture.release()
+
+
+def track_video(session_id: str, path: str, start: int, stop: Optional[int], stride: int = 1) -> Tuple[List[VideoDetection], List[Timings]]:
+    """
+    Tracks hands in the frames of a video segment picked by read_video, in
+    order, with the session's tracker. The worker decodes the video itself
+    so frames never cross process boundaries; only their landmarks are
+    returned, with the stage timings of each frame. The tracker is released
+    afterwards, as segments are not continued.
+    """
+    results = []
+    timings = []
+    try:
+        with _hands_pool.acquire(session_id) as tracker:
+            frames = read_video(path, start, stop, stride)
+            while True:
+                decode_start = time.perf_counter()
+                sampled = next(frames, None)
+                if sampled is None:
+                    break
+                index, seconds, frame = sampled
+                decoded = time.perf_counter()
+                results.append((index, seconds, tracker.track(frame)))
+                timings.append({"decode": decoded - decode_start, **tracker.timings})
+    finally:
+        release_session(session_id)
+    return results, timings
+
+
+def release_session(session_id: str) -> None:
+    if _hands_pool is not None:
+        _hands_pool.release(session_id)
+
+
+def warm_up(session_id: str) -> None:
+    """
+    Runs a blank frame through a new tracker so the worker has loaded
+    MediaPipe and its models before the first real frame. The tracker is
+    then reset and kept for the next session.
+    """
+    blank = cv2.imencode(".jpg", np.zeros((480, 640, 3), dtype=np.uint8))[1].tobytes()
+    track_hands(session_id, blank)
+    release_session(session_id)
+
+
+class InferenceExecutor:
+    """
+    Runs blocking MediaPipe/OpenCV work outside the asyncio event loop.
+
+    Work is spread over `workers` single-worker slots, each a separate process
+    (or thread with the "thread" backend) with its own trackers. A session is
+    always routed to the same slot so its tracking state stays in one place.
+    At most `max_pending` frames may be queued or running at once; beyond that
+    `run` raises InferenceBusy instead of letting latency grow without bound.
+
+    A slot whose worker dies (e.g. killed for memory or crashed in MediaPipe)
+    is replaced by a fresh one with the same settings. Only the frames that
+    were running on the dead worker fail; frames submitted after the crash
+    go to the new worker, and its sessions start over with new trackers.
+    A slot whose workers keep dying, `MAX_SLOT_CRASHES` times in a row
+    without finishing a call, makes the executor report not `ready` until
+    one of its calls succeeds again.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        backend: str = "process",
+        max_sessions: int = 32,
+        idle_timeout: float = 60.0,
+        tracker_options: Optional[Dict] = None,
+        max_hands: int = 2,
+    ):
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown inference backend: {backend}")
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.backend = backend
+        self.pending = 0
+        # Set once every worker has processed a warm-up frame
+        self.warmed_up = False
+
+        # Worker processes split the trackers between them, while thread
+        # slots all share the one pool of this process
+        slot_sessions = max(1, -(-max_sessions // self.workers)) if backend == "process" else max_sessions
+        self._initargs = (slot_sessions, idle_timeout, tracker_options or {}, max_hands)
+        self._slots: List[Executor] = [self._new_slot() for _ in range(self.workers)]
+        # Times each slot's worker died since its last successful call
+        self._crashes = [0] * self.workers
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the workers are warmed up and no slot is broken.
+        """
+        return self.warmed_up and not self.broken_slots
+
+    @property
+    def broken_slots(self) -> int:
+        """
+        Number of slots whose workers keep dying.
+        """
+        return sum(crashes >= MAX_SLOT_CRASHES for crashes in self._crashes)
+
+    def _new_slot(self) -> Executor:
+        if self.backend == "process":
+            return ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self._initargs,
+            )
+        return ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=self._initargs)
+
+    def _slot_index(self, session_id: str) -> int:
+        return zlib.crc32(session_id.encode()) % self.workers
+
+    def _restart(self, index: int, broken: Executor) -> Executor:
+        """
+        Replaces the slot `broken` with a new one, unless a call that saw the
+        same crash already did. Returns the slot now at `index`.
+        """
+        if self._slots[index] is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._crashes[index] += 1
+            try:
+                self._slots[index] = self._new_slot()
+            except Exception:
+                # Left broken, so the next call tries again
+                self._crashes[index] = max(self._crashes[index], MAX_SLOT_CRASHES)
+                raise
+        return self._slots[index]
+
+    async def run(self, session_id: str, fn, *args, frames: int = 1):
+        """
+        Runs `fn(session_id, *args)` on the session's slot. `frames` is the
+        number of frames the call processes, counted against the queue limit.
+        """
+        if self.pending and self.pending + frames > self.max_pending:
+            raise InferenceBusy(f"Inference queue is full ({self.pending} frames pending)")
+
+        index = self._slot_index(session_id)
+        slot = self._slots[index]
+        self.pending += frames
+        try:
+            try:
+                future = slot.submit(fn, session_id, *args)
+            except BrokenExecutor:
+                # The worker died on an earlier call, so this one gets a new worker
+                slot = self._restart(index, slot)
+                future = slot.submit(fn, session_id, *args)
+            result = await asyncio.wrap_future(future)
+        except BrokenExecutor:
+            # The worker died on this call: only it fails, later calls get a
+            # new worker rather than retrying a frame that may crash it again
+            self._restart(index, slot)
+            raise
+        finally:
+            self.pending -= frames
+        if slot is self._slots[index]:
+            self._crashes[index] = 0
+        return result
+
+    async def warm_up(self) -> None:
+        """
+        Starts every worker and runs a warm-up frame on it. Without this the
+        workers start, and load MediaPipe, on their first real frame.
+        """
+        await asyncio.gather(*(
+            asyncio.wrap_future(slot.submit(warm_up, f"warm-up-{i}"))
+            for i, slot in enumerate(self._slots)
+        ))
+        self.warmed_up = True
+
+    def release(self, session_id: str) -> None:
+        """
+        Frees the session's tracker without waiting for the result.
+        """
+        index = self._slot_index(session_id)
+        slot = self._slots[index]
+        try:
+            slot.submit(release_session, session_id)
+        except BrokenExecutor:
+            # The worker died along with its trackers, nothing to free
+            self._restart(index, slot)
+        except RuntimeError:
+            # The pool is shutting down
+            pass
+
+    def shutdown(self) -> None:
+        for slot in self._slots:
+            slot.shutdown(wait=False, cancel_futures=True)
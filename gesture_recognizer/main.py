@@ -1,19 +1,155 @@
 # COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
-from fastapi import FastAPI, WebSocket, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import mediapipe as mp
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.datastructures import UploadFile
+from contextlib import asynccontextmanager
 import base64
 import numpy as np
 import json
-from io import BytesIO
-from PIL import Image
 import logging
-from typing import Dict, List
-import math
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import binascii
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from classifier import LandmarkClassifier
+from features import HandFeatures, TrackedHands, parse_landmarks
+from inference import InferenceBusy, InferenceExecutor, Timings, track_hands, track_hands_batch, video_info
+from metrics import Counter, Gauge, Histogram, RateLimitedLogger, Registry
+from pacing import FramePacer
+from rules import GESTURE_RULES, MIRRORED_LABELS, NUMBER_RULES, TWO_HAND_GESTURE_RULES
+from sessions import SessionManager
+from video import recognize_video
+
+# Session limits, overridable from the environment
+MAX_SESSIONS = int(os.environ.get("ASL_MAX_SESSIONS", "32"))
+SESSION_IDLE_TIMEOUT = float(os.environ.get("ASL_SESSION_IDLE_TIMEOUT", "60"))
+
+# Server processes started by `python main.py`; each one has its own
+# inference pool
+SERVER_WORKERS = int(os.environ.get("ASL_SERVER_WORKERS", "1"))
+
+# Inference pool settings. Each worker runs frames one at a time, so the
+# number of workers is the number of frames processed in parallel. By
+# default the CPUs are shared out between the server processes.
+INFERENCE_BACKEND = os.environ.get("ASL_INFERENCE_BACKEND", "process")
+INFERENCE_WORKERS = int(os.environ.get("ASL_INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 1) // SERVER_WORKERS))))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("ASL_INFERENCE_QUEUE_SIZE", str(INFERENCE_WORKERS * 4)))
+MAX_BATCH_SIZE = int(os.environ.get("ASL_MAX_BATCH_SIZE", "64"))
+# Most hands tracked (or accepted by the landmark endpoints) per frame
+MAX_HANDS = int(os.environ.get("ASL_MAX_HANDS", "2"))
+# Whether clients send mirrored (selfie view) frames. MediaPipe's handedness
+# assumes they do, so it is swapped in responses when they do not.
+MIRRORED_INPUT = os.environ.get("ASL_MIRRORED_INPUT", "0") != "0"
+# Uploaded videos: largest accepted size in bytes, and sampled frames per
+# segment handed to a worker. Small segments keep live frames from waiting
+# long behind video work.
+MAX_VIDEO_BYTES = int(os.environ.get("ASL_MAX_VIDEO_BYTES", str(200 * 1024 * 1024)))
+VIDEO_CHUNK = int(os.environ.get("ASL_VIDEO_CHUNK", "16"))
+# Default JPEG decode downscaling (1, 2, 4 or 8), overridable per request
+DECODE_REDUCTION = int(os.environ.get("ASL_DECODE_REDUCTION", "1"))
+
+# Frame preprocessing before hand tracking: longest side in pixels,
+# cropping to the area around the last detected hand and reuse of results
+# for unchanged frames
+TRACKER_OPTIONS = {
+    "max_side": int(os.environ.get("ASL_INFERENCE_MAX_SIDE", "512")),
+    "crop": os.environ.get("ASL_ROI_CROP", "1") != "0",
+    "roi_margin": float(os.environ.get("ASL_ROI_MARGIN", "0.5")),
+    "roi_refresh": int(os.environ.get("ASL_ROI_REFRESH", "30")),
+    # Frames this close to the last tracked one reuse its landmarks
+    "dedup_threshold": float(os.environ.get("ASL_DEDUP_THRESHOLD", "8.0")),
+    "dedup_max_age": float(os.environ.get("ASL_DEDUP_MAX_AGE", "1.0")),
+}
+
+# Temporal smoothing of each session's results: a sign is reported once its
+# summed confidence over the last `window` frames reaches `threshold` and
+# until it drops below `release`
+SMOOTHING_OPTIONS = {
+    "window": int(os.environ.get("ASL_SMOOTHING_WINDOW", "5")),
+    "threshold": float(os.environ.get("ASL_SMOOTHING_THRESHOLD", "1.2")),
+    "release": float(os.environ.get("ASL_SMOOTHING_RELEASE", "0.6")),
+    "min_confidence": float(os.environ.get("ASL_SMOOTHING_MIN_CONFIDENCE", "0.5")),
+}
+
+# Suggested delay before a client's next frame (next_frame_ms in responses):
+# at least the minimum, longer under load and while the session's result
+# stays the same, and at most the maximum. Configured in milliseconds.
+PACING_OPTIONS = {
+    "min_delay": float(os.environ.get("ASL_FRAME_DELAY_MIN", "100")) / 1000,
+    "max_delay": float(os.environ.get("ASL_FRAME_DELAY_MAX", "1000")) / 1000,
+    "stable_frames": int(os.environ.get("ASL_FRAME_DELAY_STABLE_FRAMES", "10")),
+}
+
+# "rules" classifies hands with the rule tables, "model" with the classifiers
+# trained by train_classifier.py and saved in ASL_MODEL_DIR/<mode>
+CLASSIFIER = os.environ.get("ASL_CLASSIFIER", "rules")
+MODEL_DIR = os.environ.get("ASL_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+
+# Per-frame events (requests, detections, errors) are logged at most once
+# per this many seconds each
+LOG_INTERVAL = float(os.environ.get("ASL_LOG_INTERVAL", "10"))
+
+# Start the inference workers and load their models at startup rather than
+# on the first frame
+WARM_UP = os.environ.get("ASL_WARM_UP", "1") != "0"
+
+executor: Optional[InferenceExecutor] = None
+
+
+async def warm_up() -> None:
+    """
+    Runs a blank frame through every inference worker and the classifiers
+    through dummy landmarks, so the first real frames do not pay for loading
+    MediaPipe and the models. /health/ready reports ready once this is done.
+    """
+    start = time.perf_counter()
+    try:
+        for recognize in RECOGNIZERS.values():
+            recognize(HandFeatures(np.zeros((1, 21, 3), dtype=np.float32)), None)
+        await executor.warm_up()
+    except Exception as e:
+        logger.error(f"Warm-up failed: {str(e)}")
+        return
+    logger.info(f"Warmed up {INFERENCE_WORKERS} inference workers in {time.perf_counter() - start:.1f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the inference workers with the server and stops them on shutdown.
+    Warm-up runs in the background so the health endpoints answer meanwhile.
+    """
+    global executor
+    executor = InferenceExecutor(
+        workers=INFERENCE_WORKERS,
+        max_pending=INFERENCE_QUEUE_SIZE,
+        backend=INFERENCE_BACKEND,
+        max_sessions=MAX_SESSIONS,
+        idle_timeout=SESSION_IDLE_TIMEOUT,
+        tracker_options=TRACKER_OPTIONS,
+        max_hands=MAX_HANDS,
+    )
+    logger.info(f"Started {INFERENCE_WORKERS} {INFERENCE_BACKEND} inference workers")
+    if WARM_UP:
+        warm_up_task = asyncio.create_task(warm_up())
+    else:
+        # Workers start and load MediaPipe on their first frame instead
+        warm_up_task = None
+        executor.warmed_up = True
+    try:
+        yield
+    finally:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+        executor.shutdown()
+        executor = None
 
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow requests from Next.js frontend
 app.add_middleware(
@@ -24,17 +160,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MediaPipe Hands
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-mp_draw = mp.solutions.drawing_utils
-
-# Define colors for drawing
-line_spec = mp_draw.DrawingSpec(color=(0, 255, 0), thickness=2)  # Green for lines
-dot_spec = mp_draw.DrawingSpec(color=(0, 0, 255), thickness=2)  # Red for dots
-
-finger_tips = [8, 12, 16, 20]
-thumb_tip = 4
+# Recognition state of each client; hand trackers live in the inference workers
+sessions = SessionManager(idle_timeout=SESSION_IDLE_TIMEOUT, smoothing=SMOOTHING_OPTIONS)
+pacer = FramePacer(**PACING_OPTIONS)
 
 # Set up logging
 logging.basicConfig(
@@ -42,6 +170,20 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+frame_log = RateLimitedLogger(logger, interval=LOG_INTERVAL)
+
+# Metrics served on /metrics
+metrics = Registry()
+STAGE_SECONDS = metrics.register(Histogram(
+    "asl_stage_seconds", "Time spent in each stage of processing a frame", ["stage"]))
+REQUEST_SECONDS = metrics.register(Histogram(
+    "asl_request_seconds", "End-to-end latency of recognition requests", ["endpoint"]))
+REQUESTS = metrics.register(Counter(
+    "asl_requests_total", "Recognition requests by endpoint and outcome; batch and stream frames count individually", ["endpoint", "outcome"]))
+metrics.register(Gauge(
+    "asl_inference_queue_depth", "Frames queued or running on the inference workers", lambda: executor.pending if executor else 0))
+metrics.register(Gauge(
+    "asl_active_sessions", "Client sessions with recognition state", lambda: len(sessions)))
 
 # Define supported gestures with descriptions
 SUPPORTED_GESTURES = {
@@ -54,7 +196,59 @@ SUPPORTED_GESTURES = {
     "FORWARD": "Index finger pointing forward, other fingers folded - indicates direction",
     "LEFT": "Hand pointing to the left - indicates left direction",
     "RIGHT": "Hand pointing to the right - indicates right direction",
-    "I LOVE YOU": "Index finger and pinky extended with thumb out - sign language for 'I love you'"
+    "I LOVE YOU": "Index finger and pinky extended with thumb out - sign language for 'I love you'",
+    "HOUSE": "Both flat hands leaning together with the fingertips touching - forms a roof"
+}
+
+# Result while a sign has been seen but not held for long enough to report it
+PENDING = "Pending"
+PENDING_MEANING = "Sign seen, hold it steady to confirm"
+
+# Lesson sign of each gesture label
+GESTURE_SIGNS = {rule.label: rule.sign for rules in (GESTURE_RULES, TWO_HAND_GESTURE_RULES) for rule in rules.rules}
+# Lesson sign of each number label
+NUMBER_SIGNS = {rule.label: rule.sign for rule in NUMBER_RULES.rules}
+# Signs a mirrored hand is recognized as when it shows the other one
+MIRRORED_SIGNS = {GESTURE_SIGNS[label]: GESTURE_SIGNS[mirrored] for label, mirrored in MIRRORED_LABELS.items()}
+
+
+def load_recognizer(mode: str, rules, signs: Dict[str, str]):
+    """
+    Returns the function that labels each hand of a frame, given their
+    HandFeatures and the signs to look for (None for all), for a mode: the
+    trained classifier in "model" mode, if one exists for the mode, and the
+    rule table otherwise. Both return one match (or None) per hand with a
+    label and a confidence.
+    """
+    if CLASSIFIER == "model":
+        path = os.path.join(MODEL_DIR, mode)
+        if os.path.isdir(path):
+            logger.info(f"Using the trained {mode} classifier in {path}")
+            model = LandmarkClassifier.load(path)
+            
+            def predict(features: HandFeatures, targets: Optional[FrozenSet[str]]):
+                predictions = model.predict(features.landmarks)
+                if targets is None:
+                    return predictions
+                return [p if p is not None and signs.get(p.label) in targets else None for p in predictions]
+            return predict
+        logger.warning(f"No trained {mode} classifier in {path}, using the rules")
+    
+    def evaluate(features: HandFeatures, targets: Optional[FrozenSet[str]]):
+        # Only the rules that can decide between the target signs run
+        return (rules if targets is None else rules.subset(targets)).evaluate(features)
+    return evaluate
+
+
+RECOGNIZERS = {
+    "gesture": load_recognizer("gesture", GESTURE_RULES, GESTURE_SIGNS),
+    "number": load_recognizer("number", NUMBER_RULES, NUMBER_SIGNS),
+}
+
+# Every sign each mode can recognize
+MODE_SIGNS = {
+    "gesture": frozenset(GESTURE_SIGNS.values()),
+    "number": frozenset(NUMBER_SIGNS.values()),
 }
 
 # Define number gestures with descriptions
@@ -71,390 +265,863 @@ NUMBER_GESTURES = {
     "9": "Pinky closed, all other fingers extended"
 }
 
-@app.post("/api/gesture")
-async def recognize_gesture(request: Request) -> Dict[str, str]:
+def extract_base64_image(data_json: Dict) -> Optional[bytes]:
     """
-    Receives an image from the frontend, processes it to detect hand gestures,
-    and returns the recognized gesture.
-    
-    The request body should be a JSON with a base64 encoded image:
+    Pulls the base64 encoded image out of a JSON request body and decodes it.
+    Accepts both a bare base64 string and a data URL. Returns None if the
+    image field is not a string.
+    """
+    return decode_base64_image(data_json.get("image", ""))
+
+
+def decode_base64_image(image_data) -> Optional[bytes]:
+    """
+    Decodes a base64 image string, with or without a data URL prefix.
+    Returns None if the value is not a string.
+    """
+    # Handle both formats: with or without data URL prefix
+    if not isinstance(image_data, str):
+        return None
+    if "base64," in image_data:
+        base64_image = image_data.split("base64,")[1]
+    else:
+        base64_image = image_data  # Assume it's already just the base64 string
+    return base64.b64decode(base64_image)
+
+
+async def read_batch_frames(request: Request) -> Tuple[List[Optional[bytes]], Dict]:
+    """
+    Reads the frames of a batch request, in order. Accepts either a JSON body
+    with a list of base64 images:
     {
-        "image": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAEBA..."
+        "images": ["/9j/4AAQSkZJRgABAQAAAQABAAD...", "..."]
     }
+    or a multipart form with one file part per frame. Frames that cannot be
+    decoded are returned as None. Also returns the other form/JSON fields.
     """
-    logger.info("Received gesture recognition API request")
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        frames = []
+        fields = {}
+        for key, value in form.multi_items():
+            if isinstance(value, UploadFile):
+                frames.append(await value.read())
+            else:
+                fields[key] = value
+        return frames, fields
     
-    try:
-        # Parse request body
+    data_json = await request.json()
+    images = data_json.get("images")
+    if not isinstance(images, list):
+        raise ValueError("Expected an \"images\" list")
+    frames = []
+    for image_data in images:
+        try:
+            frames.append(decode_base64_image(image_data))
+        except binascii.Error:
+            frames.append(None)
+    return frames, data_json
+
+
+async def read_frame(request: Request) -> Tuple[Optional[bytes], Dict]:
+    """
+    Reads a single frame from a request body. Accepts raw image bytes
+    (image/jpeg, image/png or application/octet-stream), a multipart form
+    with an "image" file part, or a JSON body with a base64 encoded "image".
+    Also returns the other form/JSON fields.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        image = form.get("image")
+        if not isinstance(image, UploadFile):
+            # Fall back to the first file part, whatever its name
+            image = next((value for value in form.values() if isinstance(value, UploadFile)), None)
+        fields = {key: value for key, value in form.items() if not isinstance(value, UploadFile)}
+        return (await image.read() if image is not None else None), fields
+    
+    if content_type.startswith("application/json"):
         data_json = await request.json()
+        return extract_base64_image(data_json), data_json
+    
+    # Raw image body
+    return await request.body(), {}
+
+
+def parse_handedness(handedness, hands: int) -> Optional[List[str]]:
+    """
+    Validates the MediaPipe handedness labels sent with landmarks, one per
+    hand. Missing labels are allowed; those hands are taken as they are.
+    """
+    if handedness is None:
+        return None
+    if isinstance(handedness, str):
+        handedness = [label.strip() for label in handedness.split(",")]
+    if not isinstance(handedness, list) or len(handedness) != hands or not all(label in ("Left", "Right") for label in handedness):
+        raise ValueError("Handedness must be one of \"Left\" or \"Right\" per hand")
+    return handedness
+
+
+async def read_landmarks(request: Request) -> Tuple[np.ndarray, Optional[List[str]], Dict]:
+    """
+    Reads the hand landmarks of one frame from a request body, either packed
+    float32 bytes or JSON: a bare list or {"landmarks": [...]}, optionally
+    with MediaPipe's "handedness" of each hand (given in the X-Handedness
+    header for packed bodies). Also returns the other JSON fields.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        data_json = await request.json()
+        if not isinstance(data_json, dict):
+            data_json = {"landmarks": data_json}
+        if "landmarks" not in data_json:
+            raise ValueError("Missing landmarks")
+        landmarks = parse_landmarks(data_json["landmarks"])
+        return landmarks, parse_handedness(data_json.get("handedness"), len(landmarks)), data_json
+    
+    # Packed float32 body
+    landmarks = parse_landmarks(await request.body())
+    return landmarks, parse_handedness(request.headers.get("x-handedness"), len(landmarks)), {}
+
+
+async def save_video(request: Request) -> str:
+    """
+    Writes an uploaded video to a temporary file, as OpenCV only decodes
+    files, and returns its path. Accepts the raw video as the body or a
+    multipart form with a file part. The upload is copied in chunks and may
+    be at most MAX_VIDEO_BYTES long.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = next((value for value in form.values() if isinstance(value, UploadFile)), None)
+        if upload is None:
+            raise ValueError("Missing video file")
         
-        # Handle both formats: with or without data URL prefix
-        image_data = data_json.get("image", "")
-        if isinstance(image_data, str):
-            if "base64," in image_data:
-                base64_image = image_data.split("base64,")[1]
-            else:
-                base64_image = image_data  # Assume it's already just the base64 string
-        else:
-            return {"error": "Invalid image format", "gesture": "Error", "meaning": "Failed to process image"}
+        async def chunks():
+            while True:
+                chunk = await upload.read(1 << 20)
+                if not chunk:
+                    return
+                yield chunk
+        source = chunks()
+    else:
+        source = request.stream()
+    
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=".video", delete=False) as f:
+        try:
+            async for chunk in source:
+                size += len(chunk)
+                if size > MAX_VIDEO_BYTES:
+                    raise ValueError(f"Videos are limited to {MAX_VIDEO_BYTES} bytes")
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    if not size:
+        os.unlink(f.name)
+        raise ValueError("Missing video file")
+    return f.name
+
+
+def get_reduction(params) -> int:
+    """
+    JPEG decode downscaling requested with the `reduce` query parameter.
+    """
+    return int(params.get("reduce", DECODE_REDUCTION))
+
+
+def get_session_id(request: Request, data_json: Optional[Dict] = None, default: Optional[str] = None) -> str:
+    """
+    Identifies the client session from the `session_id` body field, the
+    `X-Session-Id` header or the `session` query parameter, falling back to
+    `default` or else the client address.
+    """
+    if data_json and isinstance(data_json.get("session_id"), str):
+        return data_json["session_id"]
+    session_id = request.headers.get("x-session-id") or request.query_params.get("session")
+    if session_id:
+        return session_id
+    if default is not None:
+        return default
+    return request.client.host if request.client else "anonymous"
+
+
+def get_signs(request: Request, data_json: Optional[Dict] = None):
+    """
+    The signs a client declares it is practicing, from the `signs` body field,
+    the `X-Signs` header or the `signs` query parameter. None if it did not
+    declare any with this request.
+    """
+    if data_json and "signs" in data_json:
+        return data_json["signs"]
+    return request.headers.get("x-signs", request.query_params.get("signs"))
+
+
+def declare_signs(session_id: str, signs) -> None:
+    """
+    Restricts a session's recognition to the declared signs: a list or a
+    comma separated string of lesson signs ("like", "3", ...). An empty
+    declaration goes back to recognizing every sign; a missing one leaves
+    the session as it is.
+    """
+    if signs is None:
+        return
+    if isinstance(signs, str):
+        signs = [sign.strip() for sign in signs.split(",")]
+    if not isinstance(signs, list) or not all(isinstance(sign, str) for sign in signs):
+        raise ValueError("Signs must be a list of sign names")
+    sessions.get(session_id).set_signs(frozenset(sign for sign in signs if sign) or None)
+
+
+def target_signs(session_id: str, mode: str) -> Optional[FrozenSet[str]]:
+    """
+    The signs of a mode a session looks for, None for all of them. Declared
+    signs the mode does not know are ignored, so a session that declared no
+    sign of the mode recognizes all of its signs.
+    """
+    signs = sessions.get(session_id).signs
+    if signs is None:
+        return None
+    return (signs & MODE_SIGNS[mode]) or None
+
+
+def next_frame_delay(session_id: str, mode: str, tracked: bool = True) -> int:
+    """
+    Milliseconds the session's client should wait before sending its next
+    frame; `tracked` is False for frames that skip the inference workers.
+    """
+    stable_for = sessions.get(session_id).smoother(mode).stable_for
+    queued = executor.pending / executor.workers if tracked and executor is not None else None
+    return round(pacer.delay(stable_for, queued) * 1000)
+
+
+def hand_label(handedness: Optional[str]) -> Optional[str]:
+    """
+    The hand ("Left" or "Right") a MediaPipe handedness label refers to.
+    """
+    if handedness is None or MIRRORED_INPUT:
+        return handedness
+    return "Right" if handedness == "Left" else "Left"
+
+
+def classify_gesture(hands: TrackedHands, session_id: str) -> Dict:
+    """
+    Runs the gesture rules (or classifier) on every hand found in a frame
+    and the two-handed rules on the pair of hands, if there is one. The
+    frame's gesture is smoothed over the session's last few detections;
+    "hands" lists the gesture of each hand in the frame alone.
+    """
+    session = sessions.get(session_id)
+    signs = target_signs(session_id, "gesture")
+    # Mirrored hands show the mirror image of the sign they are read as
+    candidates = signs if signs is None else signs | {MIRRORED_SIGNS.get(sign, sign) for sign in signs}
+    
+    detected_gesture = None
+    confidence = 0.0
+    per_hand = []
+    
+    if len(hands):
+        logger.debug("Hand detected in frame")
+        for i, match in enumerate(RECOGNIZERS["gesture"](hands.features, candidates)):
+            label = None
+            if match is not None:
+                # Directions were recognized on the mirrored hand
+                label = MIRRORED_LABELS.get(match.label, match.label) if hands.mirrored[i] else match.label
+                if signs is not None and GESTURE_SIGNS[label] not in signs:
+                    label = None
+                elif detected_gesture is None or match.confidence > confidence:
+                    # The most confident hand wins, ties go to the first
+                    detected_gesture, confidence = label, match.confidence
+            per_hand.append({"handedness": hand_label(hands.handedness[i]), "gesture": label, "sign": GESTURE_SIGNS.get(label)})
         
-        # Decode base64 to image
-        image_bytes = base64.b64decode(base64_image)
-        image = Image.open(BytesIO(image_bytes))
-        frame = np.array(image)
+        # A sign made with both hands beats the gestures of the single hands
+        pair = hands.pair()
+        two_hand_rules = TWO_HAND_GESTURE_RULES if signs is None else TWO_HAND_GESTURE_RULES.subset(signs)
+        if pair is not None and two_hand_rules.rules:
+            match = two_hand_rules.evaluate(pair)[0]
+            if match is not None:
+                detected_gesture, confidence = match.label, match.confidence
         
-        # Convert to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if detected_gesture is not None:
+            frame_log.info("gesture", f"Detected gesture: {[detected_gesture, GESTURE_SIGNS[detected_gesture]]}")
+    
+    # Only report gestures held for a few frames so a single misread frame
+    # cannot count as a performed sign
+    stable_gesture = session.smoother("gesture").update(detected_gesture, confidence)
+    if stable_gesture is not None:
+        detected_gesture = [stable_gesture, GESTURE_SIGNS[stable_gesture]]
+    elif detected_gesture is not None:
+        detected_gesture = [PENDING, "None"]
+    else:
+        detected_gesture = ["No hand detected", "None"]
+    
+    # Return the detected gesture
+    return {
+        "gesture": detected_gesture[0],
+        "sign": detected_gesture[1],
+        "meaning": PENDING_MEANING if detected_gesture[0] == PENDING else SUPPORTED_GESTURES.get(detected_gesture[0], "No gesture detected"),
+        "hands": per_hand,
+    }
+
+
+def classify_number(hands: TrackedHands, session_id: str) -> Dict:
+    """
+    Runs the number rules (or classifier) on every hand found in a frame.
+    The frame's number is smoothed over the session's last few detections;
+    "hands" lists the number of each hand in the frame alone.
+    """
+    session = sessions.get(session_id)
+    
+    detected_number = None
+    confidence = 0.0
+    per_hand = []
+    
+    if len(hands):
+        logger.debug("Hand detected in frame")
+        for i, match in enumerate(RECOGNIZERS["number"](hands.features, target_signs(session_id, "number"))):
+            hand = {"handedness": hand_label(hands.handedness[i]), "number": None, "confidence": "0.00"}
+            if match is not None and match.confidence > 0.5:  # Confidence threshold
+                if detected_number is None or match.confidence > confidence:
+                    # The most confident hand wins, ties go to the first
+                    detected_number = match.label
+                    confidence = match.confidence
+                hand.update(number=match.label, confidence=f"{match.confidence:.2f}")
+            per_hand.append(hand)
         
-        # Process the frame and get hand landmarks
-        results = hands.process(rgb_frame)
+        if detected_number is not None:
+            frame_log.info("number", f"Detected number: {detected_number} with confidence {confidence:.2f}")
         
-        detected_gesture = []
-        detected_gesture = ["No hand detected", "None"]
+    # Apply smoothing to prevent flickering
+    smoother = session.smoother("number")
+    stable_number = smoother.update(detected_number, confidence)
+    if stable_number is not None:
+        detected_number, confidence = stable_number, smoother.confidence(stable_number)
+    elif detected_number is not None:
+        detected_number, confidence = PENDING, 0.0
+    else:
+        detected_number, confidence = "No hand detected", 0.0
+    
+    # Return the detected number
+    return {
+        "number": detected_number,
+        "meaning": PENDING_MEANING if detected_number == PENDING else NUMBER_GESTURES.get(detected_number, "No number detected"),
+        "confidence": f"{confidence:.2f}",
+        "hands": per_hand,
+    }
+
+
+# Frame classifiers for each recognition mode
+CLASSIFIERS = {
+    "gesture": classify_gesture,
+    "number": classify_number,
+}
+
+# Error responses when the inference queue is full
+BUSY_RESPONSES = {
+    "gesture": {"error": "Server busy", "gesture": "Busy", "meaning": "Too many frames queued, try again shortly"},
+    "number": {"error": "Server busy", "number": "Busy", "meaning": "Too many frames queued, try again shortly", "confidence": "0.00"},
+}
+
+
+def observe_timings(timings: Timings) -> None:
+    """
+    Records the stage timings reported by an inference worker.
+    """
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def record_outcome(endpoint: str, mode: str, result: Dict) -> None:
+    """
+    Counts a processed frame as an error, a frame without a recognized hand,
+    one whose sign is not confirmed by smoothing yet or a recognized one.
+    """
+    if "error" in result:
+        outcome = "error"
+    elif result.get(mode) == "No hand detected":
+        outcome = "no_hand"
+    elif result.get(mode) == PENDING:
+        outcome = "pending"
+    else:
+        outcome = "recognized"
+    REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+
+
+def classify_frame(landmarks: np.ndarray, handedness: Optional[List[str]], session_id: str, mode: str) -> Dict:
+    """
+    Runs the classifier of the given mode on the hands of a frame and records
+    how long it took, hand features included.
+    """
+    start = time.perf_counter()
+    result = CLASSIFIERS[mode](TrackedHands(landmarks, handedness), session_id)
+    STAGE_SECONDS.observe(time.perf_counter() - start, stage="classify")
+    return result
+
+
+async def recognize_frame(image_bytes: bytes, session_id: str, mode: str, reduction: int = 1) -> Dict:
+    """
+    Tracks hands in an encoded frame on the inference pool and classifies them
+    for the given mode. Raises InferenceBusy when the pool is saturated.
+    """
+    (landmarks, handedness), timings = await executor.run(session_id, track_hands, image_bytes, reduction)
+    # Time spent on the worker only, the pacer accounts for the queue itself
+    pacer.observe(sum(timings.values()))
+    observe_timings(timings)
+    return classify_frame(landmarks, handedness, session_id, mode)
+
+
+async def recognize_batch(frames: List[Optional[bytes]], session_id: str, mode: str, reduction: int = 1) -> List[Dict]:
+    """
+    Tracks hands in a list of encoded frames with a single call to the
+    inference pool and classifies them in input order.
+    """
+    detections, batch_timings = await executor.run(session_id, track_hands_batch, frames, reduction, frames=len(frames))
+    if batch_timings:
+        pacer.observe(sum(sum(timings.values()) for timings in batch_timings) / len(batch_timings))
+    for timings in batch_timings:
+        observe_timings(timings)
+    
+    results = []
+    for detection in detections:
+        if detection is None:
+            results.append({"error": "Invalid image", mode: "Error", "meaning": "Failed to process image"})
+        else:
+            results.append(classify_frame(*detection, session_id, mode))
+    return results
+
+
+def error_result(mode: str, error: str) -> Dict:
+    """
+    Response for a frame that could not be processed.
+    """
+    result = {"error": error, mode: "Error", "meaning": "Failed to process image"}
+    if mode == "number":
+        result["confidence"] = "0.00"
+    return result
+
+
+async def handle_frame(request: Request, mode: str):
+    """
+    Shared implementation of the single frame endpoints.
+    """
+    endpoint = request.url.path
+    frame_log.info(endpoint, f"Received {mode} recognition API request")
+    start = time.perf_counter()
+    session_id = None
+    
+    try:
+        image_bytes, fields = await read_frame(request)
+        session_id = get_session_id(request, fields)
+        declare_signs(session_id, get_signs(request, fields))
+        if not image_bytes:
+            result = error_result(mode, "Invalid image format")
+        else:
+            result = await recognize_frame(image_bytes, session_id, mode, get_reduction(request.query_params))
+    
+    except InferenceBusy:
+        REQUESTS.inc(endpoint=endpoint, outcome="busy")
+        busy = {**BUSY_RESPONSES[mode], "next_frame_ms": round(pacer.max_delay * 1000)}
+        return JSONResponse(busy, status_code=503, headers={"Retry-After": "1"})
+    except Exception as e:
+        frame_log.error(endpoint, f"Error processing image: {str(e)}")
+        result = error_result(mode, str(e))
+    
+    if session_id is not None:
+        result["next_frame_ms"] = next_frame_delay(session_id, mode)
+    record_outcome(endpoint, mode, result)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return result
+
+
+async def handle_landmarks(request: Request, mode: str):
+    """
+    Shared implementation of the landmark endpoints. Hand tracking already
+    happened on the client, so only the classification runs, directly on the
+    event loop.
+    """
+    endpoint = request.url.path
+    frame_log.info(endpoint, f"Received {mode} landmark recognition API request")
+    start = time.perf_counter()
+    session_id = None
+    
+    try:
+        landmarks, handedness, fields = await read_landmarks(request)
+        session_id = get_session_id(request, fields)
+        declare_signs(session_id, get_signs(request, fields))
+        if len(landmarks) > MAX_HANDS:
+            raise ValueError(f"At most {MAX_HANDS} hands per frame are supported")
+        result = classify_frame(landmarks, handedness, session_id, mode)
+    
+    except Exception as e:
+        frame_log.error(endpoint, f"Error processing landmarks: {str(e)}")
+        result = error_result(mode, str(e))
+    
+    if session_id is not None:
+        result["next_frame_ms"] = next_frame_delay(session_id, mode, tracked=False)
+    record_outcome(endpoint, mode, result)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return result
+
+
+async def handle_video(request: Request, mode: str):
+    """
+    Shared implementation of the video endpoints. The timeline is streamed
+    back as JSON lines while the video is being processed.
+    """
+    endpoint = request.url.path
+    frame_log.info(endpoint, f"Received {mode} video recognition API request")
+    start = time.perf_counter()
+    # Every video is smoothed on its own
+    session_id = f"video-{uuid.uuid4().hex}"
+    
+    try:
+        stride = int(request.query_params.get("stride", "1"))
+        if stride < 1:
+            raise ValueError("Stride must be at least 1")
+        declare_signs(session_id, get_signs(request))
+        path = await save_video(request)
+        try:
+            video_info(path)
+        except ValueError:
+            os.unlink(path)
+            raise ValueError("Could not decode video")
+    except Exception as e:
+        frame_log.error(endpoint, f"Error receiving video: {str(e)}")
+        REQUESTS.inc(endpoint=endpoint, outcome="error")
+        sessions.discard(session_id)
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    def classify(landmarks: np.ndarray, handedness: Optional[List[str]]) -> Dict:
+        return classify_frame(landmarks, handedness, session_id, mode)
+    
+    def observe_segment(timings: List[Timings]) -> None:
+        for frame_timings in timings:
+            observe_timings(frame_timings)
+    
+    async def timeline():
+        try:
+            async for record in recognize_video(
+                executor, path, classify, session_id,
+                stride=stride, chunk=VIDEO_CHUNK, window=1,
+                landmarks=request.query_params.get("landmarks", "0") != "0",
+                on_timings=observe_segment,
+            ):
+                record_outcome(endpoint, mode, record)
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            frame_log.error(endpoint, f"Error processing video: {str(e)}")
+            REQUESTS.inc(endpoint=endpoint, outcome="error")
+            yield json.dumps(error_result(mode, str(e))) + "\n"
+        finally:
+            os.unlink(path)
+            sessions.discard(session_id)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    
+    return StreamingResponse(timeline(), media_type="application/x-ndjson")
+
+
+async def handle_batch(request: Request, mode: str):
+    """
+    Shared implementation of the batch endpoints.
+    """
+    endpoint = request.url.path
+    frame_log.info(endpoint, f"Received {mode} batch recognition API request")
+    start = time.perf_counter()
+    # Batches without a session id are tracked and smoothed on their own
+    batch_session = f"batch-{uuid.uuid4().hex}"
+    session_id = batch_session
+    
+    try:
+        frames, fields = await read_batch_frames(request)
+        if len(frames) > MAX_BATCH_SIZE:
+            REQUESTS.inc(endpoint=endpoint, outcome="error")
+            return JSONResponse({"error": f"Batch is limited to {MAX_BATCH_SIZE} frames", "results": []}, status_code=413)
         
-        if results.multi_hand_landmarks:
-            logger.debug("Hand detected in frame")
-            for hand_landmarks in enumerate(results.multi_hand_landmarks):
-                lm_list = []  # List to store landmark positions
-                finger_fold_status = []
-                
-                # Extract landmarks
-                for i, lm in enumerate(hand_landmarks[1].landmark):
-                    lm_list.append(lm)
-                
-                # Get frame dimensions
-                h, w, c = frame.shape
-                
-                # Check finger fold status
-                for tip in finger_tips:
-                    if lm_list[tip].x < lm_list[tip - 3].x:
-                        finger_fold_status.append(True)
-                    else:
-                        finger_fold_status.append(False)
-                
-                # Detect gestures
-                # LIKE (Thumbs-up)
-                if lm_list[thumb_tip].y < lm_list[thumb_tip - 1].y < lm_list[thumb_tip - 2].y:
-                    if all(finger_fold_status):
-                        detected_gesture[0] = "LIKE"
-                        detected_gesture[1] = "like"
-                
-                # DISLIKE (Thumbs-down)
-                if lm_list[thumb_tip].y > lm_list[thumb_tip - 1].y > lm_list[thumb_tip - 2].y:
-                    if all(finger_fold_status):
-                        detected_gesture[0] = "DISLIKE"
-                        detected_gesture[1] = "dislike"
-                
-                # OK
-                thumb_x, thumb_y = lm_list[thumb_tip].x, lm_list[thumb_tip].y
-                index_x, index_y = lm_list[8].x, lm_list[8].y
-                distance = ((thumb_x - index_x) ** 2 + (thumb_y - index_y) ** 2) ** 0.5
-                
-                if distance < 0.05:
-                    if not finger_fold_status[1] and not finger_fold_status[2] and not finger_fold_status[3]:
-                        detected_gesture[0] = "OK"
-                        detected_gesture[1] = "ok"
-                
-                # PEACE
-                thumb_x, thumb_y = lm_list[thumb_tip].x, lm_list[thumb_tip].y
-                ring_x, ring_y = lm_list[16].x, lm_list[16].y
-                pinky_x, pinky_y = lm_list[20].x, lm_list[20].y
-                
-                distance_thumb_ring = ((thumb_x - ring_x) ** 2 + (thumb_y - ring_y) ** 2) ** 0.5
-                distance_ring_pinky = ((ring_x - pinky_x) ** 2 + (ring_y - pinky_y) ** 2) ** 0.5
-                
-                if distance_thumb_ring < 0.05 and distance_ring_pinky < 0.05:
-                    if not finger_fold_status[0] and not finger_fold_status[1]:
-                        detected_gesture[0] = "PEACE"
-                        detected_gesture[1] = "peace"
-                
-                # CALL ME
-                if finger_fold_status[0] and finger_fold_status[1] and finger_fold_status[3]:
-                    thumb_x, thumb_y = lm_list[thumb_tip].x, lm_list[thumb_tip].y
-                    pinky_x, pinky_y = lm_list[20].x, lm_list[20].y
-                    distance_thumb_pinky = ((thumb_x - pinky_x) ** 2 + (thumb_y - pinky_y) ** 2) ** 0.5
-                    
-                    if distance_thumb_pinky > 0.4:
-                        detected_gesture[0] = "CALL ME"
-                        detected_gesture[1] = "call"
-                
-                # STOP
-                if (lm_list[thumb_tip].y < lm_list[thumb_tip - 1].y < lm_list[thumb_tip - 2].y and
-                        lm_list[8].y < lm_list[6].y < lm_list[5].y and
-                        lm_list[12].y < lm_list[10].y < lm_list[9].y and
-                        lm_list[16].y < lm_list[14].y < lm_list[13].y and
-                        lm_list[20].y < lm_list[18].y < lm_list[17].y):
-                    detected_gesture[0] = "STOP"
-                    detected_gesture[1] = "stop"
-                
-                # FORWARD
-                if (lm_list[8].y < lm_list[6].y < lm_list[5].y and
-                    lm_list[12].y > lm_list[11].y > lm_list[10].y and
-                    lm_list[16].y > lm_list[15].y > lm_list[14].y and
-                    lm_list[20].y > lm_list[19].y > lm_list[18].y and
-                    lm_list[thumb_tip].x > lm_list[thumb_tip - 1].x):
-                    detected_gesture[0] = "FORWARD"
-                    detected_gesture[1] = "forward"
-                
-                # LEFT
-                if (lm_list[4].y < lm_list[2].y and
-                        lm_list[8].x < lm_list[6].x and
-                        lm_list[12].x > lm_list[10].x and
-                        lm_list[16].x > lm_list[14].x and
-                        lm_list[20].x > lm_list[18].x and
-                        lm_list[5].x < lm_list[0].x):
-                    detected_gesture[0] = "LEFT"
-                    detected_gesture[1] = "left"
-                
-                # RIGHT
-                if (lm_list[4].y < lm_list[2].y and
-                        lm_list[8].x > lm_list[6].x and
-                        lm_list[12].x < lm_list[10].x and
-                        lm_list[16].x < lm_list[14].x and
-                        lm_list[20].x < lm_list[18].x):
-                    detected_gesture[0] = "RIGHT"
-                    detected_gesture[1] = "right"
-                
-                # I LOVE YOU
-                if (lm_list[8].y < lm_list[6].y < lm_list[5].y and
-                        lm_list[12].y > lm_list[11].y > lm_list[10].y and
-                        lm_list[16].y > lm_list[15].y > lm_list[14].y and
-                        lm_list[20].y < lm_list[19].y < lm_list[18].y and
-                        lm_list[thumb_tip].x > lm_list[thumb_tip - 1].x):
-                    detected_gesture[0] = "I LOVE YOU"
-                    detected_gesture[1] = "love"
-            
-                # Log when gesture changes
-                if detected_gesture != "No hand detected":
-                    logger.info(f"Detected gesture: {detected_gesture}")
-            
-        # Return the detected gesture
-        return {
-            "gesture": detected_gesture[0],
-            "sign": detected_gesture[1],
-            "meaning": SUPPORTED_GESTURES.get(detected_gesture[0], "No gesture detected")
-        }
+        session_id = get_session_id(request, fields, default=batch_session)
+        declare_signs(session_id, get_signs(request, fields))
+        results = await recognize_batch(frames, session_id, mode, get_reduction(request.query_params))
     
+    except InferenceBusy:
+        REQUESTS.inc(endpoint=endpoint, outcome="busy")
+        return JSONResponse({**BUSY_RESPONSES[mode], "results": []}, status_code=503, headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
-        return {"error": str(e), "gesture": "Error", "meaning": "Failed to process image"}
+        frame_log.error(endpoint, f"Error processing batch: {str(e)}")
+        REQUESTS.inc(endpoint=endpoint, outcome="error")
+        return {"error": str(e), "results": []}
+    finally:
+        if session_id == batch_session:
+            if executor is not None:
+                executor.release(session_id)
+            sessions.discard(session_id)
+    
+    for result in results:
+        record_outcome(endpoint, mode, result)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return {"results": results}
+
+
+@app.post("/api/gesture")
+async def recognize_gesture(request: Request) -> Dict:
+    """
+    Receives an image from the frontend, processes it to detect hand gestures,
+    and returns the recognized gesture.
+    
+    The fastest way is to POST the JPEG bytes directly with an image/jpeg or
+    application/octet-stream content type. A multipart form with an "image"
+    file part, or a JSON with a base64 encoded image, also work:
+    {
+        "image": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAEBA..."
+    }
+    
+    The optional `reduce` query parameter (2, 4 or 8) decodes the JPEG at a
+    fraction of its resolution.
+    
+    A client practicing a few signs can declare them as `signs` (body field,
+    X-Signs header or query parameter, e.g. "like,peace") so only the rules
+    that can decide them run. The response's `next_frame_ms` is how long to wait before sending
+    the next frame.
+    """
+    return await handle_frame(request, "gesture")
 
 @app.post("/api/number")
-async def recognize_number(request: Request) -> Dict[str, str]:
+async def recognize_number(request: Request) -> Dict:
     """
     Receives an image from the frontend, processes it to detect number gestures (0-9),
     and returns the recognized number.
     
-    The request body should be a JSON with a base64 encoded image:
+    The fastest way is to POST the JPEG bytes directly with an image/jpeg or
+    application/octet-stream content type. A multipart form with an "image"
+    file part, or a JSON with a base64 encoded image, also work:
     {
         "image": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAEBA..."
     }
+    
+    The optional `reduce` query parameter (2, 4 or 8) decodes the JPEG at a
+    fraction of its resolution. `signs` and `next_frame_ms` work as for
+    /api/gesture.
+    """
+    return await handle_frame(request, "number")
+
+@app.post("/api/gesture/batch")
+async def recognize_gesture_batch(request: Request):
+    """
+    Recognizes gestures in several frames at once, e.g. a recorded lesson
+    attempt. Frames are sent as {"images": [...]} or as multipart file parts
+    and the response lists one result per frame in input order:
+    {
+        "results": [{"gesture": "LIKE", "sign": "like", "meaning": "..."}, ...]
+    }
+    """
+    return await handle_batch(request, "gesture")
+
+@app.post("/api/number/batch")
+async def recognize_number_batch(request: Request):
+    """
+    Recognizes numbers in several frames at once. Takes the same body as
+    /api/gesture/batch and returns one result per frame in input order.
+    """
+    return await handle_batch(request, "number")
+
+@app.post("/api/gesture/landmarks")
+async def recognize_gesture_landmarks(request: Request) -> Dict:
+    """
+    Recognizes a gesture from hand landmarks tracked on the client, e.g. by
+    MediaPipe in the browser, skipping image decoding and hand tracking.
+    
+    The body is either the 21 landmarks of each hand as packed little-endian
+    float32 values (x, y, z per landmark, 252 bytes per hand) with an
+    application/octet-stream content type, or JSON:
+    {
+        "landmarks": [[[0.51, 0.82, 0.0], ...], ...],
+        "session_id": "..."
+    }
+    Landmarks are normalized to the frame like MediaPipe's, and JSON points
+    may also be {"x": ..., "y": ..., "z": ...} objects. The response is the
+    same as for /api/gesture.
+    """
+    return await handle_landmarks(request, "gesture")
+
+@app.post("/api/number/landmarks")
+async def recognize_number_landmarks(request: Request) -> Dict:
     """
-    logger.info("Received number recognition API request")
+    Recognizes a number from hand landmarks tracked on the client. Takes the
+    same body as /api/gesture/landmarks and responds like /api/number.
+    """
+    return await handle_landmarks(request, "number")
+
+@app.post("/api/gesture/video")
+async def recognize_gesture_video(request: Request):
+    """
+    Recognizes gestures throughout a video, e.g. a recorded lesson attempt.
+    The video is the raw request body (or a multipart file part) in any
+    format OpenCV can decode. Every `stride`-th frame (query parameter,
+    default 1) is processed and the response streams one JSON line per
+    processed frame, in order:
     
-    # Static variable to store previous detections for smoothing
-    if not hasattr(recognize_number, "prev_detections"):
-        recognize_number.prev_detections = []
+        {"frame": 0, "time": 0.0, "gesture": "LIKE", "sign": "like", ...}
     
+    Results are smoothed over the video like a live session's. `signs`
+    works as for /api/gesture and `landmarks=1` adds each frame's landmarks.
+    """
+    return await handle_video(request, "gesture")
+
+@app.post("/api/number/video")
+async def recognize_number_video(request: Request):
+    """
+    Recognizes numbers throughout a video. Takes the same body and query
+    parameters as /api/gesture/video.
+    """
+    return await handle_video(request, "number")
+
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the server process is up and its event loop responds.
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once the inference workers have been warmed up and
+    frames will be processed without startup delays, 503 until then and
+    while an inference worker keeps dying.
+    """
+    if executor is None or not executor.warmed_up:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not executor.ready:
+        return JSONResponse({"status": "broken", "broken_workers": executor.broken_slots}, status_code=503)
+    return {"status": "ready", "workers": executor.workers, "pending": executor.pending}
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Request counters, stage latency histograms, inference queue depth and
+    active sessions in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+STREAM_ENDPOINT = "/ws/recognize"
+
+@app.websocket(STREAM_ENDPOINT)
+async def recognize_stream(websocket: WebSocket):
+    """
+    Persistent recognition session. The client sends binary JPEG frames and
+    receives one JSON result per processed frame on the same socket.
+    
+    The mode is picked with the `mode` query parameter ("gesture" or "number")
+    and can be changed mid-session by sending a text message:
+    {
+        "mode": "number"
+    }
+    
+    The `session` query parameter can carry a client session id; otherwise each
+    connection gets its own session. `reduce` works as for /api/gesture, and
+    the signs to look for are declared with the `signs` query parameter or a
+    {"signs": [...]} text message.
+    
+    Only the most recent frame is kept while inference is running, so a client
+    sending faster than the server can keep up gets results for fresh frames
+    instead of a growing backlog. Frames that arrive while the inference queue
+    is full are skipped.
+    """
+    mode = websocket.query_params.get("mode", "gesture")
+    if mode not in CLASSIFIERS:
+        await websocket.close(code=1008, reason=f"Unknown mode: {mode}")
+        return
+    
+    session_id = websocket.query_params.get("session") or uuid.uuid4().hex
+    reduction = get_reduction(websocket.query_params)
     try:
-        # Parse request body
-        data_json = await request.json()
-        
-        # Handle both formats: with or without data URL prefix
-        image_data = data_json.get("image", "")
-        if isinstance(image_data, str):
-            if "base64," in image_data:
-                base64_image = image_data.split("base64,")[1]
-            else:
-                base64_image = image_data  # Assume it's already just the base64 string
-        else:
-            return {"error": "Invalid image format", "number": "Error", "meaning": "Failed to process image"}
-        
-        # Decode base64 to image
-        image_bytes = base64.b64decode(base64_image)
-        image = Image.open(BytesIO(image_bytes))
-        frame = np.array(image)
-        
-        # Convert to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Process the frame and get hand landmarks
-        results = hands.process(rgb_frame)
-        
-        detected_number = "No hand detected"
-        confidence = 0.0
-        
-        if results.multi_hand_landmarks:
-            logger.debug("Hand detected in frame")
-            for hand_landmarks in enumerate(results.multi_hand_landmarks):
-                lm_list = []  # List to store landmark positions
-                
-                # Extract landmarks
-                for i, lm in enumerate(hand_landmarks[1].landmark):
-                    lm_list.append(lm)
-                
-                # Get frame dimensions
-                h, w, c = frame.shape
-                
-                # Helper function to calculate angle between three points
-                def calculate_angle(a, b, c):
-                    a_x, a_y = a.x, a.y
-                    b_x, b_y = b.x, b.y
-                    c_x, c_y = c.x, c.y
-                    
-                    angle = math.degrees(math.atan2(c_y - b_y, c_x - b_x) - 
-                                         math.atan2(a_y - b_y, a_x - b_x))
-                    
-                    if angle < 0:
-                        angle += 360
-                        
-                    return angle
-                
-                # Calculate finger bend angles
-                thumb_angle = calculate_angle(lm_list[1], lm_list[2], lm_list[4])
-                index_angle = calculate_angle(lm_list[5], lm_list[6], lm_list[8])
-                middle_angle = calculate_angle(lm_list[9], lm_list[10], lm_list[12])
-                ring_angle = calculate_angle(lm_list[13], lm_list[14], lm_list[16])
-                pinky_angle = calculate_angle(lm_list[17], lm_list[18], lm_list[20])
-                
-                # Determine if fingers are extended based on angles and positions
-                # More robust than just comparing y coordinates
-                thumb_extended = thumb_angle > 150 and lm_list[thumb_tip].x > lm_list[thumb_tip - 1].x
-                index_extended = index_angle > 160 and lm_list[8].y < lm_list[5].y
-                middle_extended = middle_angle > 160 and lm_list[12].y < lm_list[9].y
-                ring_extended = ring_angle > 160 and lm_list[16].y < lm_list[13].y
-                pinky_extended = pinky_angle > 160 and lm_list[20].y < lm_list[17].y
-                
-                # Calculate distances between fingertips for additional features
-                thumb_index_distance = np.sqrt((lm_list[4].x - lm_list[8].x)**2 + (lm_list[4].y - lm_list[8].y)**2)
-                index_middle_distance = np.sqrt((lm_list[8].x - lm_list[12].x)**2 + (lm_list[8].y - lm_list[12].y)**2)
-                
-                # Check if thumb is across palm (for number 0)
-                thumb_across_palm = lm_list[4].x < lm_list[9].x and not thumb_extended
-                
-                # Dictionary to store confidence scores for each number
-                number_confidence = {
-                    "0": 0.0, "1": 0.0, "2": 0.0, "3": 0.0, "4": 0.0,
-                    "5": 0.0, "6": 0.0, "7": 0.0, "8": 0.0, "9": 0.0
-                }
-                
-                # Number 0: Closed fist with thumb wrapped around fingers or across palm
-                if (not index_extended and not middle_extended and not ring_extended and not pinky_extended):
-                    if thumb_across_palm:
-                        number_confidence["0"] = 0.9
-                    else:
-                        number_confidence["0"] = 0.7
-                
-                # Number 1: Index finger extended, all other fingers closed
-                if (index_extended and not middle_extended and not ring_extended and not pinky_extended):
-                    number_confidence["1"] = 0.9 if not thumb_extended else 0.7
-                
-                # Number 2: Index and middle fingers extended in a V shape
-                if (index_extended and middle_extended and not ring_extended and not pinky_extended):
-                    # Check if fingers are spread apart (V shape)
-                    if index_middle_distance > 0.1:
-                        number_confidence["2"] = 0.9
-                    else:
-                        number_confidence["2"] = 0.6
-                
-                # Number 3: Index, middle, and ring fingers extended
-                if (index_extended and middle_extended and ring_extended and not pinky_extended and not thumb_extended):
-                    number_confidence["3"] = 0.9
-                
-                # Number 4: All fingers except thumb extended
-                if (index_extended and middle_extended and ring_extended and pinky_extended and not thumb_extended):
-                    number_confidence["4"] = 0.9
-                
-                # Number 5: All fingers extended
-                if (thumb_extended and index_extended and middle_extended and ring_extended and pinky_extended):
-                    # Check if thumb is clearly separated from other fingers
-                    if thumb_index_distance > 0.15:
-                        number_confidence["5"] = 0.9
-                    else:
-                        number_confidence["5"] = 0.7
-                
-                # Number 6: Thumb, pinky, and ring finger closed, index and middle extended
-                # This is the ASL sign for 6 (thumb, pinky touching)
-                if (index_extended and middle_extended and not ring_extended and not pinky_extended):
-                    # Check for thumb position - should be near pinky for ASL 6
-                    thumb_pinky_distance = np.sqrt((lm_list[4].x - lm_list[20].x)**2 + (lm_list[4].y - lm_list[20].y)**2)
-                    if thumb_pinky_distance < 0.1 and thumb_extended:
-                        number_confidence["6"] = 0.9
-                    else:
-                        # Alternative 6 gesture (index, middle extended with spread)
-                        if index_middle_distance > 0.15:
-                            number_confidence["6"] = 0.7
-                
-                # Number 7: Index, middle, and ring fingers extended, pinky and thumb closed
-                if (index_extended and middle_extended and ring_extended and not pinky_extended and not thumb_extended):
-                    # Additional check to differentiate from 3
-                    # In ASL 7, fingers are typically more spread out
-                    if index_middle_distance > 0.08:
-                        number_confidence["7"] = 0.8
-                    else:
-                        number_confidence["3"] = 0.8  # More likely to be 3
-                
-                # Number 8: Thumb closed, all other fingers extended
-                # Alternative: index, middle, ring extended with thumb and pinky touching
-                if (index_extended and middle_extended and ring_extended):
-                    if pinky_extended and not thumb_extended:
-                        number_confidence["8"] = 0.9
-                    elif not pinky_extended and thumb_extended:
-                        # Check if thumb and pinky are touching
-                        thumb_pinky_distance = np.sqrt((lm_list[4].x - lm_list[20].x)**2 + (lm_list[4].y - lm_list[20].y)**2)
-                        if thumb_pinky_distance < 0.1:
-                            number_confidence["8"] = 0.8
-                
-                # Number 9: Index, middle, ring, and thumb extended, pinky closed
-                if (index_extended and middle_extended and ring_extended and thumb_extended and not pinky_extended):
-                    number_confidence["9"] = 0.9
-                
-                # Find the number with the highest confidence
-                max_confidence_number = max(number_confidence.items(), key=lambda x: x[1])
-                
-                if max_confidence_number[1] > 0.5:  # Confidence threshold
-                    detected_number = max_confidence_number[0]
-                    confidence = max_confidence_number[1]
-                
-                # Log when number changes with confidence
-                if detected_number != "No hand detected":
-                    logger.info(f"Detected number: {detected_number} with confidence {confidence:.2f}")
+        declare_signs(session_id, websocket.query_params.get("signs"))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    await websocket.accept()
+    logger.info(f"Opened recognition stream in {mode} mode")
+    
+    session = {"mode": mode, "frame": None, "frame_id": 0, "dropped": 0}
+    frame_ready = asyncio.Event()
+    
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
             
-        # Apply smoothing to prevent flickering
-        # Keep a history of the last 5 detections
-        recognize_number.prev_detections.append((detected_number, confidence))
-        if len(recognize_number.prev_detections) > 5:
-            recognize_number.prev_detections.pop(0)
-        
-        # Only consider high confidence detections for smoothing
-        high_conf_detections = [d for d in recognize_number.prev_detections if d[1] > 0.6]
-        
-        if high_conf_detections:
-            # Count occurrences of each number
-            number_counts = {}
-            for d, _ in high_conf_detections:
-                if d != "No hand detected":
-                    number_counts[d] = number_counts.get(d, 0) + 1
+            if message.get("bytes") is not None:
+                # Overwrite any frame that has not been picked up yet
+                if session["frame"] is not None:
+                    session["dropped"] += 1
+                    REQUESTS.inc(endpoint=STREAM_ENDPOINT, outcome="dropped")
+                session["frame"] = message["bytes"]
+                session["frame_id"] += 1
+                frame_ready.set()
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                    if not isinstance(control, dict) or not (control.get("mode") in CLASSIFIERS or "signs" in control):
+                        raise ValueError("Invalid control message")
+                    declare_signs(session_id, control.get("signs"))
+                except ValueError:
+                    await websocket.send_json({"error": "Invalid control message"})
+                    continue
+                if control.get("mode") in CLASSIFIERS:
+                    session["mode"] = control["mode"]
+    
+    async def process_frames():
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            image_bytes, frame_id = session["frame"], session["frame_id"]
+            session["frame"] = None
+            current_mode = session["mode"]
+            start = time.perf_counter()
             
-            # Find the most common number
-            if number_counts:
-                smoothed_number = max(number_counts.items(), key=lambda x: x[1])[0]
-                # Only update if the most common number appears at least twice
-                if number_counts[smoothed_number] >= 2:
-                    detected_number = smoothed_number
-        
-        # Return the detected number
-        return {
-            "number": detected_number,
-            "meaning": NUMBER_GESTURES.get(detected_number, "No number detected"),
-            "confidence": f"{confidence:.2f}" if detected_number != "No hand detected" else "0.00"
-        }
+            try:
+                result = await recognize_frame(image_bytes, session_id, current_mode, reduction)
+            except InferenceBusy:
+                session["dropped"] += 1
+                REQUESTS.inc(endpoint=STREAM_ENDPOINT, outcome="busy")
+                continue
+            except Exception as e:
+                frame_log.error(STREAM_ENDPOINT, f"Error processing stream frame: {str(e)}")
+                result = error_result(current_mode, str(e))
+            
+            record_outcome(STREAM_ENDPOINT, current_mode, result)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=STREAM_ENDPOINT)
+            await websocket.send_json({
+                **result,
+                "mode": current_mode,
+                "frame": frame_id,
+                "dropped": session["dropped"],
+                "next_frame_ms": next_frame_delay(session_id, current_mode),
+            })
     
-    except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
-        return {"error": str(e), "number": "Error", "meaning": "Failed to process image", "confidence": "0.00"}
+    tasks = [asyncio.create_task(receive_frames()), asyncio.create_task(process_frames())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        logger.info("Recognition stream closed by client")
+    finally:
+        for task in tasks:
+            task.cancel()
+        if executor is not None:
+            executor.release(session_id)
+        sessions.discard(session_id)
 
 if __name__ == "__main__":
     logger.info("Starting Gesture Recognition Server")
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if SERVER_WORKERS > 1:
+        # Every worker process imports the app and starts its own inference pool
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=SERVER_WORKERS, app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
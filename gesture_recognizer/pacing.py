@@ -0,0 +1,48 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+from typing import Optional
+
+
+class FramePacer:
+    """
+    Suggests how long a client should wait before sending its next frame.
+
+    Two things stretch the delay beyond `min_delay`:
+
+    - Load: a frame sent now waits for the frames already queued on the
+      inference workers, so the delay is at least the recent per-frame
+      inference time times the queue length per worker. Clients then never
+      send faster than the server can turn their frames around.
+    - Stability: the delay doubles every `stable_frames` frames a session's
+      result stays the same, up to 4 times `min_delay`, since nothing new is
+      happening in front of the camera.
+
+    The delay never exceeds `max_delay`. All times are in seconds.
+    """
+
+    def __init__(self, min_delay: float = 0.1, max_delay: float = 1.0, stable_frames: int = 10, smoothing: float = 0.2):
+        self.min_delay = min_delay
+        self.max_delay = max(max_delay, min_delay)
+        self.stable_frames = max(1, stable_frames)
+        # Weight of the newest observation in the moving average
+        self.smoothing = smoothing
+        self.latency = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """
+        Records how long an inference worker spent on a frame, not counting
+        the time it waited in the queue, which `delay` adds from the queue
+        length. Outliers, like the first frame of a session, count as at most
+        `max_delay`.
+        """
+        self.latency += self.smoothing * (min(seconds, self.max_delay) - self.latency)
+
+    def delay(self, stable_for: int, queued: Optional[float] = None) -> float:
+        """
+        Suggested delay for a session whose result has not changed for
+        `stable_for` frames, with `queued` frames pending per inference worker
+        (None when the frame does not go through the workers).
+        """
+        delay = self.min_delay * 2 ** min(stable_for // self.stable_frames, 2)
+        if queued is not None:
+            delay = max(delay, self.latency * (1 + queued))
+        return min(delay, self.max_delay)
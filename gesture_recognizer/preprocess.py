@@ -0,0 +1,250 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from features import hands_to_array, hands_to_handedness
+
+# Pixel box (x0, y0, x1, y1) within a frame
+Box = Tuple[int, int, int, int]
+
+# (N, 21, 3) landmarks and MediaPipe's handedness label of each hand
+Detection = Tuple[np.ndarray, List[str]]
+
+
+def downscale(frame: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Shrinks a frame so its longer side is at most `max_side` pixels. Smaller
+    (or empty) frames are returned unchanged.
+    """
+    h, w = frame.shape[:2]
+    if not h or not w:
+        return frame
+    scale = max_side / max(h, w)
+    if max_side <= 0 or scale >= 1:
+        return frame
+    return cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def frame_signature(frame: np.ndarray, box: Optional[Box] = None, size: int = 32) -> np.ndarray:
+    """
+    A small grayscale thumbnail of a frame, or of the area `box` of it, cheap
+    to compare with the one of another frame.
+    """
+    if box is not None:
+        x0, y0, x1, y1 = box
+        frame = frame[y0:y1, x0:x1]
+    small = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return small.mean(axis=2, dtype=np.float32)
+
+
+def landmarks_box(landmarks: np.ndarray, width: int, height: int) -> Box:
+    """
+    Pixel bounding box around the normalized landmarks of all hands.
+    """
+    xy = landmarks[..., :2].reshape(-1, 2)
+    x0, y0 = xy.min(axis=0)
+    x1, y1 = xy.max(axis=0)
+    return int(x0 * width), int(y0 * height), int(np.ceil(x1 * width)), int(np.ceil(y1 * height))
+
+
+def expand_box(box: Box, margin: float, width: int, height: int, min_side: int = 96) -> Box:
+    """
+    Grows a box into a square `1 + 2 * margin` times its longer side, centered
+    on the original box and shifted to stay inside the frame.
+    """
+    x0, y0, x1, y1 = box
+    side = int(max(x1 - x0, y1 - y0, 1) * (1 + 2 * margin))
+    side = min(max(side, min_side), width, height)
+    cx, cy = (x0 + x1) // 2, (y0 + y1) // 2
+    left = min(max(cx - side // 2, 0), width - side)
+    top = min(max(cy - side // 2, 0), height - side)
+    return left, top, left + side, top + side
+
+
+def contains(outer: Box, inner: Box, border: float) -> bool:
+    """
+    Whether `inner` lies inside `outer` shrunk by `border` of its size on
+    each side.
+    """
+    ox0, oy0, ox1, oy1 = outer
+    dx, dy = (ox1 - ox0) * border, (oy1 - oy0) * border
+    x0, y0, x1, y1 = inner
+    return x0 >= ox0 + dx and y0 >= oy0 + dy and x1 <= ox1 - dx and y1 <= oy1 - dy
+
+
+def to_frame_coords(landmarks: np.ndarray, box: Box, width: int, height: int) -> np.ndarray:
+    """
+    Maps landmarks normalized to a crop back to coordinates normalized to the
+    full frame. z follows MediaPipe's convention of using the x scale.
+    """
+    x0, y0, x1, y1 = box
+    scale = np.array([(x1 - x0) / width, (y1 - y0) / height, (x1 - x0) / width], dtype=np.float32)
+    offset = np.array([x0 / width, y0 / height, 0], dtype=np.float32)
+    return landmarks * scale + offset
+
+
+class Tracker:
+    """
+    A session's MediaPipe Hands instance plus the adaptive preprocessing
+    around it.
+
+    Frames are downscaled to at most `max_side` pixels before inference. Once
+    a hand has been found, following frames are cropped to a square around
+    it, `roi_margin` times the hand size on each side, so most of the
+    background is never processed (unless `crop` is off). The crop only
+    moves when the hand gets close to its edge, which keeps MediaPipe's own
+    tracking valid, and the full frame is checked again every `roi_refresh`
+    frames so new hands are still picked up.
+
+    MediaPipe tracks a hand from the region it found it in on the previous
+    input, in that input's normalized coordinates. Whenever the area passed
+    to it changes (crop moved, switch between crop and full frame) those
+    coordinates no longer match, so its tracking state is reset and it runs
+    palm detection on the new area instead.
+
+    Learners often hold a pose for seconds. The area around the hands of the
+    last tracked frame (the whole frame if it had none) is kept as a 32x32
+    grayscale thumbnail, and a frame whose thumbnail of the same area differs
+    from it by less than `dedup_threshold` gray levels in every cell reuses
+    that frame's landmarks, as long as they are less than `dedup_max_age`
+    seconds old (0 disables). Cells are a few pixels of the hand, so a moved
+    finger changes some of them by tens of gray levels, while sensor noise
+    averages out to a few.
+
+    After each call to `track`, `timings` holds the seconds spent in
+    "preprocess" and, unless the result was reused, in "inference".
+    """
+
+    def __init__(
+        self,
+        hands,
+        max_side: int = 512,
+        crop: bool = True,
+        roi_margin: float = 0.5,
+        roi_refresh: int = 30,
+        dedup_threshold: float = 8.0,
+        dedup_max_age: float = 1.0,
+    ):
+        self.hands = hands
+        self.max_side = max_side
+        self.crop = crop
+        self.roi_margin = roi_margin
+        self.roi_refresh = roi_refresh
+        self.dedup_threshold = dedup_threshold
+        self.dedup_max_age = dedup_max_age
+        self.roi: Optional[Box] = None
+        # (height, width) of the frames the ROI was computed for
+        self.roi_size: Tuple[int, int] = (0, 0)
+        self.frames_in_roi = 0
+        # Area of the frame MediaPipe was given last
+        self.last_box: Optional[Box] = None
+        self.timings: Dict[str, float] = {}
+        self._clear_cache()
+
+    def track(self, frame: np.ndarray) -> Detection:
+        """
+        Runs hand tracking on an RGB frame. Returns (N, 21, 3) landmarks
+        normalized to the full frame and the handedness of each hand.
+        """
+        start = time.perf_counter()
+        self.timings = {}
+        detection = self._track_or_reuse(frame)
+        # Everything but hands.process counts as preprocessing
+        self.timings["preprocess"] = time.perf_counter() - start - self.timings.get("inference", 0.0)
+        return detection
+
+    def _track_or_reuse(self, frame: np.ndarray) -> Detection:
+        if self.dedup_threshold <= 0:
+            return self._track(frame)
+
+        height, width = frame.shape[:2]
+        now = time.monotonic()
+        if (self.cached is not None
+                and now - self.cached_at < self.dedup_max_age
+                and (height, width) == self.cached_size
+                and np.abs(frame_signature(frame, self.cached_box) - self.cached_signature).max() < self.dedup_threshold):
+            return self.cached
+
+        # Compare later frames to this one rather than to the previous frame
+        # so slow drift still triggers a fresh inference
+        self.cached = self._track(frame)
+        landmarks = self.cached[0]
+        if len(landmarks):
+            self.cached_box = expand_box(landmarks_box(landmarks, width, height), 0.25, width, height)
+        else:
+            self.cached_box = None
+        self.cached_signature = frame_signature(frame, self.cached_box)
+        self.cached_size = (height, width)
+        self.cached_at = now
+        return self.cached
+
+    def _track(self, frame: np.ndarray) -> Detection:
+        height, width = frame.shape[:2]
+        if self.roi is not None and self.roi_size != (height, width):
+            # The frame size changed (e.g. another camera or decode reduction),
+            # so the crop no longer fits and MediaPipe's state is stale
+            self.roi = None
+            self.last_box = None
+        if self.roi is not None and self.frames_in_roi < self.roi_refresh:
+            box = self.roi
+            self.frames_in_roi += 1
+        else:
+            box = (0, 0, width, height)
+            self.frames_in_roi = 0
+
+        if box != self.last_box:
+            self.hands.reset()
+            self.last_box = box
+
+        x0, y0, x1, y1 = box
+        view = downscale(frame[y0:y1, x0:x1], self.max_side)
+        view = np.ascontiguousarray(view)
+        start = time.perf_counter()
+        results = self.hands.process(view)
+        self.timings["inference"] = time.perf_counter() - start
+        landmarks = hands_to_array(results.multi_hand_landmarks)
+        handedness = hands_to_handedness(results.multi_handedness)
+
+        if not len(landmarks):
+            self.roi = None
+            return landmarks, handedness
+
+        landmarks = to_frame_coords(landmarks, box, width, height)
+        if self.crop:
+            self.roi = self._next_roi(landmarks, width, height)
+            self.roi_size = (height, width)
+        return landmarks, handedness
+
+    def _next_roi(self, landmarks: np.ndarray, width: int, height: int) -> Optional[Box]:
+        hand = landmarks_box(landmarks, width, height)
+        if self.roi is not None and contains(self.roi, hand, border=0.1):
+            return self.roi
+
+        roi = expand_box(hand, self.roi_margin, width, height)
+        self.frames_in_roi = 0
+        # Not worth cropping when the hand fills most of the frame
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) > 0.8 * width * height:
+            return None
+        return roi
+
+    def _clear_cache(self) -> None:
+        self.cached: Optional[Detection] = None
+        self.cached_signature: Optional[np.ndarray] = None
+        # Area of the frame the signature covers, None for all of it
+        self.cached_box: Optional[Box] = None
+        self.cached_size: Tuple[int, int] = (0, 0)
+        self.cached_at = 0.0
+
+    def reset(self) -> None:
+        self.hands.reset()
+        self.roi = None
+        self.roi_size = (0, 0)
+        self.frames_in_roi = 0
+        self.last_box = None
+        self._clear_cache()
+
+    def close(self) -> None:
+        self.hands.close()
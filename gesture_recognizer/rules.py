@@ -0,0 +1,266 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence
+
+import numpy as np
+
+from features import HandFeatures, PairFeatures, THUMB, INDEX, MIDDLE, RING, PINKY
+
+# Named boolean predicates over precomputed hand features. Each returns one
+# value per hand in the batch.
+CONDITIONS: Dict[str, Callable[[HandFeatures], np.ndarray]] = {
+    # Thumb direction
+    "thumb_up": lambda f: f.thumb_up,
+    "thumb_down": lambda f: f.thumb_down,
+    "thumb_out": lambda f: f.thumb_out,
+    "thumb_raised": lambda f: f.thumb_raised,
+    "palm_left": lambda f: f.palm_left,
+    "thumb_across_palm": lambda f: f.thumb_across_palm,
+    "thumb_extended": lambda f: f.extended[:, THUMB],
+    # Fingertip distances
+    "thumb_index_touch": lambda f: f.distance(THUMB, INDEX) < 0.05,
+    "thumb_index_spread": lambda f: f.distance(THUMB, INDEX) > 0.15,
+    "thumb_ring_touch": lambda f: f.distance(THUMB, RING) < 0.05,
+    "ring_pinky_touch": lambda f: f.distance(RING, PINKY) < 0.05,
+    "thumb_pinky_touch": lambda f: f.distance(THUMB, PINKY) < 0.1,
+    "thumb_pinky_far": lambda f: f.distance(THUMB, PINKY) > 0.4,
+    "index_middle_apart": lambda f: f.distance(INDEX, MIDDLE) > 0.08,
+    "index_middle_spread": lambda f: f.distance(INDEX, MIDDLE) > 0.1,
+    "index_middle_wide": lambda f: f.distance(INDEX, MIDDLE) > 0.15,
+}
+
+
+def _finger_condition(attribute: str, column: int) -> Callable[[HandFeatures], np.ndarray]:
+    return lambda f: getattr(f, attribute)[:, column]
+
+
+# Per-finger states, e.g. "index_folded" or "pinky_up". Per-finger feature
+# arrays start at the index finger, hence the offset.
+for _name, _digit in [("index", INDEX), ("middle", MIDDLE), ("ring", RING), ("pinky", PINKY)]:
+    CONDITIONS[f"{_name}_folded"] = _finger_condition("folded", _digit - 1)
+    CONDITIONS[f"{_name}_up"] = _finger_condition("pointing_up", _digit - 1)
+    CONDITIONS[f"{_name}_curled"] = _finger_condition("curled", _digit - 1)
+    CONDITIONS[f"{_name}_tip_raised"] = _finger_condition("tip_raised", _digit - 1)
+    CONDITIONS[f"{_name}_left"] = _finger_condition("pointing_left", _digit - 1)
+    CONDITIONS[f"{_name}_right"] = _finger_condition("pointing_right", _digit - 1)
+    CONDITIONS[f"{_name}_extended"] = _finger_condition("extended", _digit)
+
+
+def _hand_condition(hand: str, condition: Callable[[HandFeatures], np.ndarray]) -> Callable[[PairFeatures], np.ndarray]:
+    return lambda p: condition(getattr(p, hand))
+
+
+# Predicates over two-handed poses: every single hand condition for each
+# hand, e.g. "left_index_up", plus the relative position of the hands
+PAIR_CONDITIONS: Dict[str, Callable[[PairFeatures], np.ndarray]] = {
+    f"{_hand}_{_name}": _hand_condition(_hand, _condition)
+    for _hand in ("right", "left")
+    for _name, _condition in CONDITIONS.items()
+}
+PAIR_CONDITIONS.update({
+    "index_tips_touch": lambda p: p.distance(INDEX, INDEX) < 0.06,
+    "middle_tips_touch": lambda p: p.distance(MIDDLE, MIDDLE) < 0.06,
+    "thumb_tips_touch": lambda p: p.distance(THUMB, THUMB) < 0.06,
+    "wrists_apart": lambda p: p.wrist_distance > 0.15,
+})
+
+# Labels that name a direction, swapped for mirrored hands
+MIRRORED_LABELS = {"LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+# Restricted rule sets kept compiled per rule set, see RuleSet.subset
+MAX_SUBSETS = 32
+
+
+class Rule:
+    """
+    A sign that is recognized when all of its conditions hold. Conditions are
+    names from the rule set's conditions, prefixed with "!" when they must be
+    false.
+    """
+
+    def __init__(self, label: str, sign: str, requires: Sequence[str], confidence: float = 1.0, priority: int = 0):
+        self.label = label
+        self.sign = sign
+        self.confidence = confidence
+        self.priority = priority
+        self.requires = {name.lstrip("!"): not name.startswith("!") for name in requires}
+
+    def __repr__(self) -> str:
+        return f"Rule({self.label!r}, confidence={self.confidence})"
+
+
+class _Node:
+    def __init__(self, condition: Optional[str] = None, if_true=None, if_false=None, rule: Optional[Rule] = None):
+        self.condition = condition
+        self.if_true = if_true
+        self.if_false = if_false
+        self.rule = rule
+
+
+class RuleSet:
+    """
+    A rule table compiled into a decision tree.
+
+    When several rules match, the one with the highest priority wins, then
+    the highest confidence, then the one declared first. Compilation splits
+    on the conditions of the best remaining candidate until its conditions
+    are settled, so evaluation stops at the first guaranteed winner and only
+    tests conditions that can still change the outcome.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Rule],
+        conditions: Dict[str, Callable] = CONDITIONS,
+        targets: Optional[FrozenSet[str]] = None,
+    ):
+        for rule in rules:
+            for name in rule.requires:
+                if name not in conditions:
+                    raise ValueError(f"Unknown condition {name!r} in rule {rule.label!r}")
+        self.conditions = conditions
+        # Signs that may be reported; the rules of other signs only reject
+        self.targets = targets
+        ordered = sorted(enumerate(rules), key=lambda item: (-item[1].priority, -item[1].confidence, item[0]))
+        self.rules: List[Rule] = [rule for _, rule in ordered]
+        # Identical subtrees reached through different paths are shared
+        self._compiled: Dict[tuple, _Node] = {}
+        self.root = self._compile(self.rules, {})
+        del self._compiled
+        # Rule sets restricted to a set of signs, most recently used last
+        self._subsets: "OrderedDict[FrozenSet[str], RuleSet]" = OrderedDict()
+
+    @property
+    def signs(self) -> FrozenSet[str]:
+        return frozenset(rule.sign for rule in self.rules if self.targets is None or rule.sign in self.targets)
+
+    def subset(self, signs: FrozenSet[str]) -> "RuleSet":
+        """
+        The rule set restricted to the given signs, compiled on first use and
+        cached. It reports the same winner as the full table whenever that
+        winner is one of the signs, and None otherwise: rules of other signs
+        that outrank a rule of the set are kept to reject the hands they win,
+        and the rest are dropped. Once no rule of the set can match, a hand is
+        settled without testing the conditions only other signs need.
+        """
+        subset = self._subsets.get(signs)
+        if subset is None:
+            ranks = [i for i, rule in enumerate(self.rules) if rule.sign in signs]
+            # Rules ranked below every rule of the set can never change the outcome
+            outranking = self.rules[:ranks[-1] + 1] if ranks else []
+            subset = RuleSet(outranking, self.conditions, targets=signs)
+            if len(self._subsets) >= MAX_SUBSETS:
+                self._subsets.popitem(last=False)
+            self._subsets[signs] = subset
+        else:
+            self._subsets.move_to_end(signs)
+        return subset
+
+    def _compile(self, candidates: List[Rule], decided: Dict[str, bool]) -> _Node:
+        if not candidates:
+            return _Node()
+        if self.targets is not None and not any(rule.sign in self.targets for rule in candidates):
+            return _Node()
+
+        relevant = {name for rule in candidates for name in rule.requires}
+        key = (tuple(id(rule) for rule in candidates), frozenset((name, value) for name, value in decided.items() if name in relevant))
+        if key in self._compiled:
+            return self._compiled[key]
+
+        best = candidates[0]
+        pending = [name for name in best.requires if name not in decided]
+        if not pending:
+            # Everything the best candidate needs is known to hold
+            rejected = self.targets is not None and best.sign not in self.targets
+            node = self._compiled[key] = _Node(rule=None if rejected else best)
+            return node
+
+        # Split on the condition of the best candidate shared by most rules
+        condition = max(pending, key=lambda name: sum(name in rule.requires for rule in candidates))
+        branches = {}
+        for value in (True, False):
+            remaining = [rule for rule in candidates if rule.requires.get(condition, value) == value]
+            branches[value] = self._compile(remaining, {**decided, condition: value})
+        node = self._compiled[key] = _Node(condition, branches[True], branches[False])
+        return node
+
+    def evaluate(self, features) -> List[Optional[Rule]]:
+        """
+        Returns the winning rule for every hand (or pair of hands, for
+        PAIR_CONDITIONS rules) in the batch, or None.
+        """
+        matches: List[Optional[Rule]] = [None] * len(features)
+        cache: Dict[str, np.ndarray] = {}
+        self._walk(self.root, features, np.arange(len(features)), matches, cache)
+        return matches
+
+    def _walk(self, node: _Node, features, hands: np.ndarray, matches: List, cache: Dict) -> None:
+        if not len(hands):
+            return
+        if node.condition is None:
+            for i in hands:
+                matches[i] = node.rule
+            return
+
+        # Conditions are computed for the whole batch the first time a hand needs them
+        values = cache.get(node.condition)
+        if values is None:
+            values = cache[node.condition] = np.asarray(self.conditions[node.condition](features), dtype=bool)
+        selected = values[hands]
+        self._walk(node.if_true, features, hands[selected], matches, cache)
+        self._walk(node.if_false, features, hands[~selected], matches, cache)
+
+
+ALL_FOLDED = ("index_folded", "middle_folded", "ring_folded", "pinky_folded")
+
+# When several gestures match, the one with the highest priority wins
+GESTURE_RULES = RuleSet([
+    Rule("LIKE", "like", ("thumb_up", *ALL_FOLDED), priority=1),
+    Rule("DISLIKE", "dislike", ("thumb_down", *ALL_FOLDED), priority=2),
+    Rule("OK", "ok", ("thumb_index_touch", "!middle_folded", "!ring_folded", "!pinky_folded"), priority=3),
+    Rule("PEACE", "peace", ("thumb_ring_touch", "ring_pinky_touch", "!index_folded", "!middle_folded"), priority=4),
+    Rule("CALL ME", "call", ("index_folded", "middle_folded", "pinky_folded", "thumb_pinky_far"), priority=5),
+    Rule("STOP", "stop", ("thumb_up", "index_up", "middle_up", "ring_up", "pinky_up"), priority=6),
+    Rule("FORWARD", "forward", ("index_up", "middle_curled", "ring_curled", "pinky_curled", "thumb_out"), priority=7),
+    Rule("LEFT", "left", ("thumb_raised", "index_left", "middle_right", "ring_right", "pinky_right", "palm_left"), priority=8),
+    Rule("RIGHT", "right", ("thumb_raised", "index_right", "middle_left", "ring_left", "pinky_left"), priority=9),
+    Rule("I LOVE YOU", "love", ("index_up", "middle_curled", "ring_curled", "pinky_tip_raised", "thumb_out"), priority=10),
+])
+
+# Signs made with both hands, evaluated over the pair of hands in a frame
+TWO_HAND_GESTURE_RULES = RuleSet([
+    # Flat hands leaning together like a roof
+    Rule("HOUSE", "house", (
+        "right_index_extended", "right_middle_extended", "right_ring_extended", "right_pinky_extended",
+        "left_index_extended", "left_middle_extended", "left_ring_extended", "left_pinky_extended",
+        "middle_tips_touch", "wrists_apart",
+    )),
+], conditions=PAIR_CONDITIONS)
+
+FIST = ("!index_extended", "!middle_extended", "!ring_extended", "!pinky_extended")
+TWO_FINGERS = ("index_extended", "middle_extended", "!ring_extended", "!pinky_extended")
+THREE_FINGERS = ("index_extended", "middle_extended", "ring_extended", "!pinky_extended")
+FOUR_FINGERS = ("index_extended", "middle_extended", "ring_extended", "pinky_extended")
+
+# The most confident matching number wins, ties go to the smaller number
+NUMBER_RULES = RuleSet([
+    Rule("0", "0", (*FIST, "thumb_across_palm"), confidence=0.9),
+    Rule("0", "0", FIST, confidence=0.7),
+    Rule("1", "1", ("index_extended", "!middle_extended", "!ring_extended", "!pinky_extended", "!thumb_extended"), confidence=0.9),
+    Rule("1", "1", ("index_extended", "!middle_extended", "!ring_extended", "!pinky_extended", "thumb_extended"), confidence=0.7),
+    Rule("2", "2", (*TWO_FINGERS, "index_middle_spread"), confidence=0.9),
+    Rule("2", "2", TWO_FINGERS, confidence=0.6),
+    # Spread fingers hint at 7, but 3 takes precedence over the same pattern
+    Rule("3", "3", (*THREE_FINGERS, "!thumb_extended", "index_middle_apart"), confidence=0.9),
+    Rule("3", "3", (*THREE_FINGERS, "!thumb_extended"), confidence=0.8),
+    Rule("4", "4", (*FOUR_FINGERS, "!thumb_extended"), confidence=0.9),
+    Rule("5", "5", (*FOUR_FINGERS, "thumb_extended", "thumb_index_spread"), confidence=0.9),
+    Rule("5", "5", (*FOUR_FINGERS, "thumb_extended"), confidence=0.7),
+    # ASL 6: thumb touching the pinky, or index and middle spread wide
+    Rule("6", "6", (*TWO_FINGERS, "thumb_extended", "thumb_pinky_touch"), confidence=0.9),
+    Rule("6", "6", (*TWO_FINGERS, "index_middle_wide"), confidence=0.7),
+    Rule("7", "7", (*THREE_FINGERS, "!thumb_extended", "index_middle_apart"), confidence=0.8),
+    Rule("8", "8", (*FOUR_FINGERS, "!thumb_extended"), confidence=0.9),
+    Rule("8", "8", (*THREE_FINGERS, "thumb_extended", "thumb_pinky_touch"), confidence=0.8),
+    Rule("9", "9", (*THREE_FINGERS, "thumb_extended"), confidence=0.9),
+])
@@ -0,0 +1,156 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional
+
+from smoothing import Smoother
+
+
+class HandsPool:
+    """
+    Keeps one MediaPipe Hands instance per session so tracking state is never
+    shared between users. Instances of sessions that go idle are reset and
+    kept for reuse instead of being rebuilt for the next session.
+    """
+
+    def __init__(self, factory: Callable, max_instances: int = 32, idle_timeout: float = 60.0):
+        self.factory = factory
+        self.max_instances = max_instances
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # session id -> (hands, lock, last used), least recently used first
+        self._active: "OrderedDict[str, list]" = OrderedDict()
+        self._spare: List = []
+        self._last_sweep = time.monotonic()
+
+    @contextmanager
+    def acquire(self, session_id: str) -> Iterator:
+        """
+        Yields the Hands instance bound to a session. Frames of the same
+        session are processed one at a time.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep > self.idle_timeout / 2:
+                self._evict_idle(now)
+
+            entry = self._active.get(session_id)
+            if entry is None:
+                if len(self._active) >= self.max_instances:
+                    # Pool is full, hand the least recently used instance over
+                    _, (hands, hands_lock, _) = self._active.popitem(last=False)
+                    with hands_lock:
+                        hands.reset()
+                elif self._spare:
+                    hands = self._spare.pop()
+                else:
+                    hands = self.factory()
+                entry = [hands, threading.Lock(), now]
+                self._active[session_id] = entry
+            else:
+                self._active.move_to_end(session_id)
+            entry[2] = now
+
+        with entry[1]:
+            yield entry[0]
+
+    def release(self, session_id: str) -> None:
+        """
+        Returns a session's instance to the pool, e.g. when its socket closes.
+        """
+        with self._lock:
+            entry = self._active.pop(session_id, None)
+            if entry is not None:
+                self._park(entry)
+
+    def _evict_idle(self, now: float) -> None:
+        self._last_sweep = now
+        for session_id in [s for s, entry in self._active.items() if now - entry[2] > self.idle_timeout]:
+            self._park(self._active.pop(session_id))
+
+    def _park(self, entry: list) -> None:
+        hands, hands_lock, _ = entry
+        # Drop the tracking state so the next session starts from detection
+        with hands_lock:
+            hands.reset()
+        if len(self._spare) < self.max_instances:
+            self._spare.append(hands)
+        else:
+            hands.close()
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+
+class Session:
+    """
+    Per-client recognition state.
+    """
+
+    def __init__(self, session_id: str, smoothing: Optional[Dict] = None):
+        self.session_id = session_id
+        self.last_seen = time.monotonic()
+        self.smoothing = smoothing or {}
+        # One smoother per recognition mode, created on first use
+        self.smoothers: Dict[str, Smoother] = {}
+        # Signs the client is practicing, None to recognize every sign
+        self.signs: Optional[FrozenSet[str]] = None
+
+    def smoother(self, mode: str) -> Smoother:
+        smoother = self.smoothers.get(mode)
+        if smoother is None:
+            smoother = self.smoothers[mode] = Smoother(**self.smoothing)
+        return smoother
+
+    def set_signs(self, signs: Optional[FrozenSet[str]]) -> None:
+        """
+        Restricts recognition to a set of signs. Smoothing starts over when
+        the set changes, so signs outside the new set stop being reported
+        right away.
+        """
+        if signs != self.signs:
+            self.signs = signs
+            for smoother in self.smoothers.values():
+                smoother.reset()
+
+
+class SessionManager:
+    """
+    Tracks recognition sessions keyed by client session id and forgets the
+    ones that have been idle for longer than `idle_timeout` seconds.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0, smoothing: Optional[Dict] = None):
+        self.idle_timeout = idle_timeout
+        # Smoother options of every new session
+        self.smoothing = smoothing or {}
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Session] = {}
+        self._last_sweep = time.monotonic()
+
+    def get(self, session_id: str) -> Session:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep > self.idle_timeout / 2:
+                self._evict_idle(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.smoothing)
+                self._sessions[session_id] = session
+            session.last_seen = now
+            return session
+
+    def discard(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def _evict_idle(self, now: float) -> None:
+        self._last_sweep = now
+        for session_id in [s for s, session in self._sessions.items() if now - session.last_seen > self.idle_timeout]:
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,98 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+from typing import Dict, List, Optional
+
+# Lowest release level: below it a label would outlive all of its votes
+MIN_RELEASE = 1e-6
+
+
+class Smoother:
+    """
+    Stabilizes a stream of per-frame detections with a sliding-window vote.
+
+    The last `window` detections are kept in a ring buffer and every label's
+    summed confidence in the window is updated incrementally, so each frame
+    costs O(1) whatever the window size. Detections with a confidence of at
+    most `min_confidence` do not vote.
+
+    The output has hysteresis: a label only becomes the output once its votes
+    reach `threshold` and outweigh the current output, and the current output
+    is kept until its votes drop below `release`. A single stray frame can
+    therefore never change the output, and a held sign does not flicker off
+    because of one bad frame. None means no stable detection.
+    """
+
+    def __init__(self, window: int = 5, threshold: float = 1.2, release: float = 0.6, min_confidence: float = 0.5):
+        if window < 1:
+            raise ValueError("Smoothing window must hold at least one frame")
+        self.window = window
+        self.threshold = threshold
+        # A label is always released once it has no votes left in the window
+        self.release = min(max(release, MIN_RELEASE), threshold)
+        self.min_confidence = min_confidence
+        # Ring buffer of (label, confidence) votes, None for frames without one
+        self._labels: List[Optional[str]] = [None] * window
+        self._confidences: List[float] = [0.0] * window
+        self._next = 0
+        # Summed confidence and number of votes of each label in the window
+        self.votes: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.current: Optional[str] = None
+        # Frames since the output last changed
+        self.stable_for = 0
+
+    def update(self, label: Optional[str], confidence: float = 1.0) -> Optional[str]:
+        """
+        Adds a frame's detection (None if nothing was detected) and returns
+        the stable label.
+        """
+        i = self._next
+        self._next = (i + 1) % self.window
+
+        old = self._labels[i]
+        if old is not None:
+            self._remove(old, self._confidences[i])
+
+        if label is not None and confidence > self.min_confidence:
+            self._labels[i] = label
+            self._confidences[i] = confidence
+            self.votes[label] = self.votes.get(label, 0.0) + confidence
+            self.counts[label] = self.counts.get(label, 0) + 1
+        else:
+            self._labels[i] = None
+
+        current = self.current
+        if current is not None and self.votes.get(current, 0.0) < self.release:
+            current = None
+        # Only the label that just gained a vote can overtake the output
+        if label is not None and label != current:
+            votes = self.votes.get(label, 0.0)
+            if votes >= self.threshold and (current is None or votes > self.votes.get(current, 0.0)):
+                current = label
+        self.stable_for = self.stable_for + 1 if current == self.current else 0
+        self.current = current
+        return current
+
+    def _remove(self, label: str, confidence: float) -> None:
+        count = self.counts[label] - 1
+        if count:
+            self.counts[label] = count
+            self.votes[label] -= confidence
+        else:
+            # Drop the label entirely so float sums cannot drift
+            del self.counts[label]
+            del self.votes[label]
+
+    def confidence(self, label: str) -> float:
+        """
+        Mean confidence of the label's votes in the window.
+        """
+        count = self.counts.get(label)
+        return self.votes[label] / count if count else 0.0
+
+    def reset(self) -> None:
+        self._labels = [None] * self.window
+        self._next = 0
+        self.votes.clear()
+        self.counts.clear()
+        self.current = None
+        self.stable_for = 0
@@ -0,0 +1,111 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+"""
+Trains a landmark classifier for the server's ASL_CLASSIFIER=model mode.
+
+The dataset is a directory with one subdirectory per label, named after the
+gesture or number it shows ("LIKE", "3", ...; "none" for frames without a
+sign), holding .npy landmark arrays of shape (N, 21, 3) or (21, 3):
+
+    python train_classifier.py --data recordings/numbers --mode number --output models/number
+
+A part of the data is held out to report the accuracy and latency of the
+trained model next to the rule tables; the report is saved with the model.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmark.stats import measure
+from classifier import NO_SIGN, LandmarkClassifier
+from features import HandFeatures
+from rules import GESTURE_RULES, NUMBER_RULES
+
+RULES = {"gesture": GESTURE_RULES, "number": NUMBER_RULES}
+
+
+def load_dataset(data_dir: Path) -> Tuple[np.ndarray, List[str]]:
+    landmarks = []
+    labels = []
+    for label_dir in sorted(path for path in data_dir.iterdir() if path.is_dir()):
+        for path in sorted(label_dir.glob("*.npy")):
+            hands = np.load(path).astype(np.float32).reshape(-1, 21, 3)
+            landmarks.append(hands)
+            labels.extend([label_dir.name] * len(hands))
+    if not landmarks:
+        raise SystemExit(f"No .npy landmark files found under {data_dir}")
+    return np.concatenate(landmarks), labels
+
+
+def rule_labels(mode: str, landmarks: np.ndarray) -> List[str]:
+    """
+    What the rule tables answer for each hand, with the same confidence
+    threshold as the server.
+    """
+    labels = []
+    for rule in RULES[mode].evaluate(HandFeatures(landmarks)):
+        if rule is None or (mode == "number" and rule.confidence <= 0.5):
+            labels.append(NO_SIGN)
+        else:
+            labels.append(rule.label)
+    return labels
+
+
+def evaluate(mode: str, model: LandmarkClassifier, landmarks: np.ndarray, labels: List[str]) -> Dict:
+    predicted = [p.label if p else NO_SIGN for p in model.predict(landmarks)]
+    from_rules = rule_labels(mode, landmarks)
+    truth = np.array(labels)
+    frames = [hand[np.newaxis] for hand in landmarks[:500]]
+    rules = RULES[mode]
+    return {
+        "samples": len(labels),
+        "model_accuracy": round(float(np.mean(np.array(predicted) == truth)), 4),
+        "rules_accuracy": round(float(np.mean(np.array(from_rules) == truth)), 4),
+        "model_latency": measure("model", model.predict, frames),
+        "rules_latency": measure("rules", lambda hand: rules.evaluate(HandFeatures(hand)), frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a landmark classifier")
+    parser.add_argument("--data", required=True, help="directory with one subdirectory of .npy files per label")
+    parser.add_argument("--mode", required=True, choices=sorted(RULES), help="recognition mode the model is for")
+    parser.add_argument("--output", required=True, help="model directory to write, e.g. models/number")
+    parser.add_argument("--hidden", type=int, default=64, help="hidden layer size")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.01)
+    parser.add_argument("--validation", type=float, default=0.2, help="fraction of the data held out for the report")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    landmarks, labels = load_dataset(Path(args.data))
+    known = {rule.label for rule in RULES[args.mode].rules} | {NO_SIGN}
+    unknown = set(labels) - known
+    if unknown:
+        raise SystemExit(f"Unknown {args.mode} labels: {', '.join(sorted(unknown))}")
+
+    order = np.random.default_rng(args.seed).permutation(len(labels))
+    held_out = int(len(order) * args.validation)
+    train, test = order[held_out:], order[:held_out]
+
+    model = LandmarkClassifier.train(
+        landmarks[train],
+        [labels[i] for i in train],
+        hidden=args.hidden,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        seed=args.seed,
+    )
+    model.save(args.output)
+
+    report = {"mode": args.mode, "labels": model.labels, "training_samples": len(train)}
+    if held_out:
+        report["validation"] = evaluate(args.mode, model, landmarks[test], [labels[i] for i in test])
+    (Path(args.output) / "report.json").write_text(json.dumps(report, indent=2) + "\n")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
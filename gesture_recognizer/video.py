@@ -0,0 +1,184 @@
+# COMP 3450: Mfon Udoh, Pasang Sherpa, Shubham Jangra
+"""
+Recognizes signs in video files, e.g. the lesson videos or recorded lesson
+attempts, and writes a timeline with the result of every sampled frame as
+JSON lines:
+
+    python video.py attempt.mp4 --mode number --stride 2 --output attempt.jsonl
+
+Videos are split into segments that the inference workers decode and track
+in parallel, and results are written as soon as they are in, so memory use
+does not grow with the length of a video. A summary of the signs seen in
+each video is printed to stderr.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from features import canonical_landmarks
+from inference import InferenceBusy, InferenceExecutor, Timings, track_video, video_info
+
+# Classifies the landmarks and handedness of one frame; called in frame order
+Classify = Callable[[np.ndarray, Optional[List[str]]], Dict]
+
+
+def segments(frame_count: int, length: int) -> Iterator[Tuple[int, Optional[int]]]:
+    """
+    Splits a video into contiguous (start, stop) frame ranges of `length`
+    frames. The last range is open-ended, since containers do not always
+    report the exact frame count (0 when they report none).
+    """
+    start = 0
+    while frame_count and start + length < frame_count:
+        yield start, start + length
+        start += length
+    yield start, None
+
+
+async def recognize_video(
+    executor: InferenceExecutor,
+    path: str,
+    classify: Classify,
+    session_id: str,
+    stride: int = 1,
+    chunk: int = 64,
+    window: int = 2,
+    landmarks: bool = False,
+    on_timings: Optional[Callable[[List[Timings]], None]] = None,
+    retry_delay: float = 0.5,
+) -> AsyncIterator[Dict]:
+    """
+    Yields the timeline of a video: the "frame" index, "time" in seconds and
+    classification of every `stride`-th frame, in order. If asked for, the
+    frame's "landmarks" are added as the classifiers see them, i.e. left
+    hands mirrored onto right-hand geometry like train_classifier.py
+    expects, with MediaPipe's "handedness" of each hand.
+
+    The video is split into segments of `chunk` sampled frames that the
+    executor's workers decode and track on their own, up to `window` at a
+    time, so memory use is bounded by `window * chunk` frames' landmarks.
+    Each segment takes up one place in the inference queue; segments turned
+    away because the queue is full are retried after `retry_delay` seconds,
+    so video work gives way to live frames.
+    """
+    if stride < 1 or chunk < 1:
+        raise ValueError("Stride and chunk must be at least 1")
+    frame_count, _ = video_info(path)
+    ranges = enumerate(segments(frame_count, chunk * stride))
+    pending: Deque[asyncio.Future] = deque()
+
+    async def run(i: int, start: int, stop: Optional[int]):
+        while True:
+            try:
+                # Segments are tracked independently, each with its own tracker
+                return await executor.run(f"{session_id}:{i}", track_video, path, start, stop, stride)
+            except InferenceBusy:
+                await asyncio.sleep(retry_delay)
+
+    def submit() -> None:
+        item = next(ranges, None)
+        if item is not None:
+            i, (start, stop) = item
+            pending.append(asyncio.ensure_future(run(i, start, stop)))
+
+    try:
+        for _ in range(max(1, window)):
+            submit()
+        while pending:
+            detections, timings = await pending.popleft()
+            submit()
+            if on_timings is not None:
+                on_timings(timings)
+            for index, seconds, (hands, handedness) in detections:
+                record = {"frame": index, "time": round(seconds, 3), **classify(hands, handedness)}
+                if landmarks:
+                    record["landmarks"] = np.round(canonical_landmarks(hands, handedness), 4).tolist()
+                    record["handedness"] = handedness
+                yield record
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recognize signs in video files")
+    parser.add_argument("videos", nargs="+", help="video files, e.g. lesson videos or recorded attempts")
+    parser.add_argument("--mode", default="gesture", choices=["gesture", "number"], help="recognition mode")
+    parser.add_argument("--stride", type=int, default=1, help="process every n-th frame")
+    parser.add_argument("--chunk", type=int, default=64, help="sampled frames per segment handed to a worker")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="inference workers")
+    parser.add_argument("--backend", default="process", choices=["process", "thread"], help="inference backend")
+    parser.add_argument("--signs", help="comma separated signs to look for, e.g. the lesson's")
+    parser.add_argument("--landmarks", action="store_true", help="include the canonical landmarks and handedness of each frame, e.g. to build datasets")
+    parser.add_argument("--output", help="JSONL file for one video, directory for several (default: stdout, current directory)")
+    return parser.parse_args()
+
+
+async def process_videos(args) -> None:
+    # main.py reads its configuration from the environment at import time
+    import main as server
+
+    executor = InferenceExecutor(
+        workers=args.workers,
+        max_pending=args.workers * 4,
+        backend=args.backend,
+        max_sessions=args.workers * 2,
+        tracker_options=server.TRACKER_OPTIONS,
+        max_hands=server.MAX_HANDS,
+    )
+    try:
+        for video in args.videos:
+            session_id = f"video:{video}"
+            server.declare_signs(session_id, args.signs)
+
+            def classify(hands: np.ndarray, handedness: Optional[List[str]]) -> Dict:
+                return server.classify_frame(hands, handedness, session_id, args.mode)
+
+            if len(args.videos) == 1:
+                path = args.output
+            else:
+                directory = Path(args.output or ".")
+                directory.mkdir(parents=True, exist_ok=True)
+                path = directory / f"{Path(video).stem}.jsonl"
+            output = open(path, "w") if path else sys.stdout
+
+            start = time.perf_counter()
+            frames = 0
+            # First time each sign was reported
+            seen: Dict[str, float] = {}
+            try:
+                async for record in recognize_video(
+                    executor, video, classify, session_id,
+                    stride=args.stride, chunk=args.chunk, window=args.workers * 2, landmarks=args.landmarks,
+                ):
+                    output.write(json.dumps(record) + "\n")
+                    frames += 1
+                    label = record.get(args.mode)
+                    if label not in ("No hand detected", "Error", server.PENDING):
+                        seen.setdefault(label, record["time"])
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+                server.sessions.discard(session_id)
+
+            elapsed = time.perf_counter() - start
+            signs = ", ".join(f"{label} at {seconds:.2f}s" for label, seconds in seen.items()) or "none"
+            print(f"{video}: {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} fps), signs: {signs}", file=sys.stderr)
+    finally:
+        executor.shutdown()
+
+
+def main():
+    asyncio.run(process_videos(parse_args()))
+
+
+if __name__ == "__main__":
+    main()